@@ -1,38 +1,137 @@
+"""Bearer-token authentication shared by the API routes."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import verify_token
-from app.services.user_service import UserService
-
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    token = credentials.credentials
-    username = verify_token(token)
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user_service = UserService(db)
-    user = user_service.get_user_by_username(username)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
-
-
-def get_current_active_user(current_user=Depends(get_current_user)):
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.profiling import timed
+
+security = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail="Invalid token"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class TokenCache:
+    """Bounded LRU cache of already-verified tokens.
+
+    Entries map a token to its subject and are dropped at the token's own
+    ``exp`` or after ``ttl`` seconds, whichever comes first, so a cached
+    token is never accepted past its expiry.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (subject, expires_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token, subject, expires_at):
+        if self.maxsize <= 0:
+            return
+        expires_at = min(expires_at, time.time() + self.ttl)
+        with self._lock:
+            self._entries[token] = (subject, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class TokenAuthenticator:
+    """FastAPI dependency resolving the bearer token to the current user.
+
+    ``lookup_user`` maps a token subject (the user's email) to the stored
+    user record, or ``None``. Use as ``Depends(authenticator)``.
+    """
+
+    def __init__(self, secret_key, algorithm, lookup_user, cache=None):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.lookup_user = lookup_user
+        self.cache = cache if cache is not None else TokenCache()
+
+    def verify(self, token):
+        """Return the token subject, skipping HMAC verification on cache hits."""
+        subject = self.cache.get(token)
+        if subject is not None:
+            return subject
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except jwt.ExpiredSignatureError:
+            raise _unauthorized("Token expired")
+        except jwt.InvalidTokenError:
+            raise _unauthorized()
+        subject = payload.get("sub")
+        if not subject:
+            raise _unauthorized()
+        # Tokens without an exp claim are only trusted for the cache ttl
+        self.cache.put(token, subject, payload.get("exp", float("inf")))
+        return subject
+
+    @timed("auth")
+    def user_for(self, token):
+        user = self.lookup_user(self.verify(token))
+        if user is None:
+            raise _unauthorized()
+        return user
+
+    async def __call__(
+        self, credentials: HTTPAuthorizationCredentials = Depends(security)
+    ):
+        if credentials is None:
+            raise _unauthorized()
+        return self.user_for(credentials.credentials)
+
+    async def header_or_query(
+        self,
+        token: Optional[str] = None,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+    ):
+        """Like ``__call__``, also accepting ``?token=``.
+
+        For EventSource clients, which cannot set request headers.
+        """
+        if credentials is not None:
+            token = credentials.credentials
+        if not token:
+            raise _unauthorized()
+        return self.user_for(token)
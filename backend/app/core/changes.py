@@ -0,0 +1,117 @@
+"""Change tracking for in-memory collections: versions and a change log."""
+
+import secrets
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ChangeTracker:
+    """Monotonic change sequence shared by a set of watched collections.
+
+    Every mutation of a watched collection takes the next sequence number,
+    which becomes the version of both the collection and the touched
+    record. ``position`` returns how many changes the storage has recorded
+    (``StorageEngine.sequence``); the sequence never falls behind it, so
+    changes to unwatched collections still count, and with an ``epoch``
+    shared through the storage, every worker using it numbers the same
+    change alike. Changes replayed from another worker are made inside
+    ``replaying()``, which stamps them all with the position they were
+    read up to: never earlier than the change itself, so a client may be
+    sent a change twice but never misses one. Versions and tokens
+    therefore hold across workers (and restarts, for a persisted epoch).
+    Without a ``position`` the epoch is random and versions are per process.
+
+    The tracker also keeps a change log holding the latest entry per
+    record, ordered by sequence, with deletes kept as tombstones. Reading
+    the changes after a sync token walks the log from its newest end, so it
+    costs O(changes) rather than O(records). Once more than
+    ``max_tombstones`` deletes are held, the oldest entries are trimmed and
+    tokens older than the trimmed point require a full resync.
+    """
+
+    def __init__(self, max_tombstones=10000, epoch=None, position=None):
+        self.epoch = epoch or secrets.token_hex(4)
+        self.position = position or (lambda: 0)
+        # Records untouched since start-up are as they were at this point
+        self.start = self.sequence = self.position()
+        self.max_tombstones = max_tombstones
+        self.horizon = self.start  # every change after this sequence is in the log
+        self._replaying = None
+        self._collection_versions = {}  # name -> sequence
+        self._record_versions = {}  # name -> {key: sequence}
+        self._log = OrderedDict()  # (name, key) -> (sequence, record, deleted)
+        self._tombstones = 0
+
+    def watch(self, collection, name):
+        self._collection_versions[name] = self.start
+        versions = self._record_versions[name] = {}
+        key_field = collection.primary_key
+
+        def on_change(old, new):
+            if self._replaying is None:
+                self.sequence = max(self.sequence, self.position()) + 1
+            self._collection_versions[name] = self.sequence
+            if new is None:
+                key = old[key_field]
+                versions.pop(key, None)
+                self._record(name, key, old, deleted=True)
+            else:
+                key = new[key_field]
+                versions[key] = self.sequence
+                self._record(name, key, new, deleted=False)
+
+        collection.subscribe(on_change)
+
+    def _record(self, name, key, record, deleted):
+        previous = self._log.pop((name, key), None)
+        if previous is not None and previous[2]:
+            self._tombstones -= 1
+        self._log[(name, key)] = (self.sequence, record, deleted)
+        if deleted:
+            self._tombstones += 1
+        while self._tombstones > self.max_tombstones:
+            _, (sequence, _, was_deleted) = self._log.popitem(last=False)
+            self.horizon = sequence
+            if was_deleted:
+                self._tombstones -= 1
+
+    @contextmanager
+    def replaying(self):
+        """Stamp the changes made in the block with the current position."""
+        self.sequence = self._replaying = max(self.sequence, self.position())
+        try:
+            yield
+        finally:
+            self._replaying = None
+
+    def collection_version(self, name):
+        return self._collection_versions[name]
+
+    def record_version(self, name, key):
+        return self._record_versions[name].get(key, self.start)
+
+    def token(self):
+        """Opaque sync token for the current state."""
+        return f"{self.epoch}.{self.sequence}"
+
+    def changes_since(self, token):
+        """Return ``[(name, record, deleted), ...]`` after ``token``, oldest first.
+
+        Deleted entries carry the record as it was when removed. Returns
+        ``None`` when the token cannot be served incrementally (missing,
+        malformed, from another epoch, or older than the log) and the
+        client must start over from a full listing.
+        """
+        epoch, _, sequence = (token or "").partition(".")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence < self.horizon or sequence > self.sequence:
+            return None
+        entries = []
+        for (name, _), (entry_sequence, record, deleted) in reversed(self._log.items()):
+            if entry_sequence <= sequence:
+                break
+            entries.append((name, record, deleted))
+        entries.reverse()
+        return entries
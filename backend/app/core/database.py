@@ -1,15 +1,63 @@
 from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
+_engine = None
+
+
+def create_db_engine(
+    url,
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+):
+    """Create an engine with a tuned connection pool.
+
+    SQLite in-memory databases use a single shared connection (each
+    connection would otherwise get its own empty database, e.g. one per
+    writer thread), so the pool sizing arguments only apply to server and
+    file databases.
+    """
+    kwargs = {"pool_pre_ping": pool_pre_ping}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if ":memory:" in url or url == "sqlite://":
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
+    return create_engine(url, **kwargs)
+
+
+def get_engine():
+    """Return the shared engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine(
+            SQLALCHEMY_DATABASE_URL,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        SessionLocal.configure(bind=_engine)
+    return _engine
 
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
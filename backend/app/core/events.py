@@ -0,0 +1,112 @@
+"""In-process fan-out of change events to Server-Sent Events streams."""
+
+import asyncio
+
+from app.core.serialization import dumps
+
+RESYNC = "event: resync\ndata: {}\n\n"
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    payload = dumps(data).decode("utf-8")
+    return f"{head}event: {event}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One stream's bounded queue of encoded events.
+
+    A subscriber that falls ``maxsize`` events behind is not allowed to
+    hold the publisher up or grow without bound: its backlog is dropped and
+    replaced by a single ``resync`` event, after which the client refetches
+    (e.g. through ``/api/sync``) and delivery resumes.
+    """
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, message):
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.overflowed = True
+            return False
+
+    async def get(self, timeout=None):
+        """Next encoded event, or ``None`` if ``timeout`` seconds pass first."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is RESYNC:
+            self.overflowed = False
+        return message
+
+
+class EventHub:
+    """Routes change events to the streams of the users they concern.
+
+    ``publish`` runs on the event loop (collection listeners fire inside
+    request handlers) and never awaits, so a mutation costs one encode plus
+    one ``put_nowait`` per open stream of the affected user.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers = {}  # user id -> {Subscription}
+
+    def __len__(self):
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subs = self._subscribers.get(subscription.user_id)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event, data, event_id=None):
+        subs = self._subscribers.get(user_id)
+        if not subs:
+            return
+        message = format_event(event, data, event_id)
+        for subscription in list(subs):
+            if not subscription.push(message):
+                self.dropped += 1
+
+    def watch(self, collection, name, owner_field, version=None):
+        """Publish a ``change`` event to the owner of every mutated record.
+
+        ``version`` returns the sync token to attach, so a client can resume
+        with ``/api/sync`` from the last event it saw.
+        """
+        key_field = collection.primary_key
+
+        def on_change(old, new):
+            record = new if new is not None else old
+            data = {
+                "collection": name,
+                "op": "put" if new is not None else "del",
+                "id": record[key_field],
+            }
+            if new is not None:
+                data["record"] = new
+            event_id = version() if version is not None else None
+            self.publish(record.get(owner_field), "change", data, event_id)
+
+        collection.subscribe(on_change)
@@ -0,0 +1,444 @@
+"""In-memory record collections with hash indexes on selected fields."""
+
+import bisect
+import heapq
+from collections import Counter
+from operator import itemgetter
+
+from app.core.profiling import timed
+
+# A field absent from a stored record, as reported by ``Deferred.fields``
+MISSING = object()
+
+
+class Deferred:
+    """Placeholder for a stored record that is decoded on first access."""
+
+    __slots__ = ()
+
+    def load(self):
+        raise NotImplementedError
+
+    def fields(self, names):
+        """Values of ``names`` if known without decoding, else ``None``.
+
+        A field the record does not have is reported as ``MISSING``.
+        """
+        return None
+
+    def location(self):
+        """``(table, row)`` if the record's fields are stored column-wise.
+
+        ``table.group(field, keys, rows)`` then returns the values of
+        ``field`` for many records at once (see ``snapshot.ColumnTable``).
+        """
+        return None
+
+
+class IndexedCollection:
+    """Records keyed by primary key, with secondary hash indexes.
+
+    Each index maps a field value to the keys of the records holding it
+    (an insertion-ordered dict used as a set), so lookups by
+    primary key are O(1) and lookups by an indexed field are O(k) in the
+    number of matches. All mutations must go through ``insert``, ``update``
+    and ``remove`` to keep the indexes in step with the records.
+
+    Listeners registered with ``subscribe`` are called as
+    ``listener(old, new)`` after every mutation: ``old`` is ``None`` for an
+    insert, ``new`` is ``None`` for a remove, and for an update ``old`` is a
+    copy of the record taken before the change.
+
+    With a ``record_type`` (see ``app.core.models``), inserted dicts are
+    converted with ``record_type.from_dict`` so the collection holds typed
+    records only.
+
+    ``from_mapping`` adopts a loaded ``{key: record}`` mapping whose values
+    may be ``Deferred`` placeholders. Those are decoded the first time they
+    are read, and the secondary indexes are only built by the first lookup
+    that needs them, so a large dataset is ready to serve without decoding
+    it up front. Building an index reads placeholders through ``scan``,
+    which does not decode them when their snapshot stores the fields.
+    """
+
+    def __init__(self, records=(), primary_key="id", indexes=(), record_type=None):
+        self.primary_key = primary_key
+        self.record_type = record_type
+        self._records = {}
+        self._indexes = {field: {} for field in indexes}
+        self._indexed = True
+        self._deferred = 0
+        self._max_id = 0
+        self._listeners = []
+        for record in records:
+            self.insert(record)
+
+    @classmethod
+    def from_mapping(
+        cls, records, primary_key="id", indexes=(), record_type=None, max_id=0
+    ):
+        """Adopt ``records`` (``{key: record or Deferred}``) without copying.
+
+        ``max_id`` is the highest id used before, deleted records included;
+        ``next_id`` stays above it.
+        """
+        collection = cls(
+            primary_key=primary_key, indexes=indexes, record_type=record_type
+        )
+        collection._records = records
+        collection._indexed = not collection._indexes
+        for key, record in records.items():
+            if isinstance(record, Deferred):
+                collection._deferred += 1
+            elif record_type is not None and not isinstance(record, record_type):
+                records[key] = record_type.from_dict(record)
+        int_keys = [key for key in records if isinstance(key, int)]
+        collection._max_id = max(max_id, max(int_keys, default=0))
+        return collection
+
+    def _resolve(self, key, record):
+        if isinstance(record, Deferred):
+            record = record.load()
+            if self.record_type is not None:
+                record = self.record_type.from_dict(record)
+            self._records[key] = record
+            self._deferred -= 1
+        return record
+
+    def _materialize(self):
+        """Decode every deferred record."""
+        if self._deferred:
+            for key, record in list(self._records.items()):
+                self._resolve(key, record)
+
+    def _ensure_indexed(self):
+        if self._indexed:
+            return
+        # Records still encoded in a column store are indexed a column at a
+        # time, without decoding them; the rest one record at a time
+        located = {}
+        for key, record in self._records.items():
+            location = record.location() if isinstance(record, Deferred) else None
+            if location is None:
+                self._index_add(self._resolve(key, record))
+            else:
+                keys, rows = located.setdefault(location[0], ([], []))
+                keys.append(key)
+                rows.append(location[1])
+        defaults = self.record_type.defaults() if self.record_type else {}
+        for table, (keys, rows) in located.items():
+            for field, index in self._indexes.items():
+                groups = table.group(field, keys, rows)
+                if groups is None:
+                    for key in keys:
+                        self._index_add(self[key], (field,))
+                    continue
+                for value, group in groups:
+                    if value is MISSING:
+                        value = defaults.get(field)
+                    index.setdefault(value, {}).update(dict.fromkeys(group))
+        self._indexed = True
+
+    def scan(self, fields):
+        """Yield every record, for building an index over ``fields``.
+
+        A placeholder whose ``fields`` are known without decoding comes as
+        a dict of its primary key and ``fields`` (absent ones filled in as
+        ``record_type`` would); other placeholders are decoded.
+        """
+        fields = tuple(fields)
+        defaults = self.record_type.defaults() if self.record_type else {}
+        for key, record in self._records.items():
+            if isinstance(record, Deferred):
+                values = record.fields(fields)
+                if values is None:
+                    record = self._resolve(key, record)
+                else:
+                    view = {self.primary_key: key}
+                    for field, value in zip(fields, values):
+                        view[field] = defaults.get(field) if value is MISSING else value
+                    yield view
+                    continue
+            yield record
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        self._materialize()
+        return iter(list(self._records.values()))
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __getitem__(self, key):
+        return self._resolve(key, self._records[key])
+
+    def as_dict(self):
+        """Live ``{primary key: record or Deferred}`` view, for storage."""
+        return self._records
+
+    def get(self, key, default=None):
+        record = self._records.get(key)
+        return default if record is None else self._resolve(key, record)
+
+    def find(self, field, value):
+        """Return the records whose ``field`` equals ``value``."""
+        self._ensure_indexed()
+        try:
+            bucket = self._indexes[field].get(value)
+        except TypeError:
+            return []
+        return [self[key] for key in bucket] if bucket else []
+
+    @timed("lookup")
+    def where(self, **criteria):
+        """Return the records matching every indexed ``field=value`` pair.
+
+        Candidates come from the smallest matching bucket; the other
+        criteria are checked by key membership in their buckets, so the
+        cost is O(smallest bucket) rather than O(collection).
+        """
+        if not criteria:
+            self._materialize()
+            return list(self._records.values())
+        self._ensure_indexed()
+        buckets = []
+        for field, value in criteria.items():
+            try:
+                bucket = self._indexes[field].get(value)
+            except TypeError:
+                return []
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        records, resolve = self._records, self._resolve
+        return [
+            resolve(key, records[key])
+            for key in smallest
+            if all(key in bucket for bucket in others)
+        ]
+
+    def next_id(self):
+        return self._max_id + 1
+
+    def reserve_ids(self, max_id):
+        """Keep ``next_id`` above ``max_id`` (ids used elsewhere, e.g. deleted)."""
+        self._max_id = max(self._max_id, max_id)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, old, new):
+        for listener in self._listeners:
+            listener(old, new)
+
+    def _index_add(self, record, fields=None):
+        key = record[self.primary_key]
+        for field in fields if fields is not None else self._indexes:
+            try:
+                self._indexes[field].setdefault(record.get(field), {})[key] = None
+            except TypeError:
+                # Unhashable values (e.g. lists in free-form bodies) are not indexed
+                continue
+
+    def _index_discard(self, record, fields=None):
+        key = record[self.primary_key]
+        for field in fields if fields is not None else self._indexes:
+            index = self._indexes[field]
+            try:
+                bucket = index.get(record.get(field))
+            except TypeError:
+                continue
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[record.get(field)]
+
+    def insert(self, record):
+        if self.record_type is not None and not isinstance(record, self.record_type):
+            record = self.record_type.from_dict(record)
+        key = record[self.primary_key]
+        if key in self._records:
+            raise KeyError(f"Duplicate key: {key!r}")
+        self._records[key] = record
+        if self._indexed:
+            self._index_add(record)
+        if isinstance(key, int) and key > self._max_id:
+            self._max_id = key
+        self._notify(None, record)
+        return record
+
+    def update(self, key, changes):
+        """Apply ``changes`` to the record in place and reindex it."""
+        record = self[key]
+        old = dict(record) if self._listeners else None
+        # Only reindex fields whose value changes, keeping bucket order stable
+        moved = [
+            field
+            for field in (self._indexes if self._indexed else ())
+            if field in changes and changes[field] != record.get(field)
+        ]
+        self._index_discard(record, moved)
+        record.update(changes)
+        self._index_add(record, moved)
+        self._notify(old, record)
+        return record
+
+    def remove(self, key):
+        record = self[key]
+        del self._records[key]
+        if self._indexed:
+            self._index_discard(record)
+        self._notify(record, None)
+        return record
+
+
+class SortedIndex:
+    """Records of a collection kept ordered by a computed sort key.
+
+    ``key(record)`` returns a comparable tuple ending in the record's
+    primary key, or ``None`` to leave the record out. The index follows the
+    collection's mutations, and ``range`` answers ``lo <= key < hi``
+    queries by bisection in O(log n + k). The index is built by its first
+    query rather than at construction; naming the fields ``key`` reads in
+    ``reads`` lets it be built with ``collection.scan``, without decoding
+    records.
+    """
+
+    def __init__(self, collection, key, reads=None):
+        self._collection = collection
+        self._key = key
+        self._reads = reads
+        self._keys = None
+        collection.subscribe(self._on_change)
+
+    def _records(self):
+        if self._reads is None:
+            return iter(self._collection)
+        return self._collection.scan(self._reads)
+
+    def __len__(self):
+        return len(self._sorted_keys())
+
+    def _sorted_keys(self):
+        if self._keys is None:
+            keys = (self._key(record) for record in self._records())
+            self._keys = sorted(k for k in keys if k is not None)
+        return self._keys
+
+    def _on_change(self, old, new):
+        if self._keys is None:
+            return
+        old_key = self._key(old) if old is not None else None
+        new_key = self._key(new) if new is not None else None
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            position = bisect.bisect_left(self._keys, old_key)
+            if position < len(self._keys) and self._keys[position] == old_key:
+                del self._keys[position]
+        if new_key is not None:
+            bisect.insort(self._keys, new_key)
+
+    @timed("lookup")
+    def range(self, lo, hi, limit=None):
+        """Return the records with ``lo <= key < hi`` in key order."""
+        keys = self._sorted_keys()
+        start = bisect.bisect_left(keys, lo)
+        stop = bisect.bisect_left(keys, hi, lo=start)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return [self._collection[k[-1]] for k in keys[start:stop]]
+
+    @timed("lookup")
+    def count(self, lo, hi):
+        keys = self._sorted_keys()
+        return bisect.bisect_left(keys, hi) - bisect.bisect_left(keys, lo)
+
+
+class CountIndex:
+    """Per-group counts of field values, following a collection's mutations.
+
+    ``group(record)`` returns the key a record is counted under, or ``None``
+    to leave it out. For every group the index counts its records, in total
+    and by value of each of ``fields``. It is built by its first query like
+    ``SortedIndex``, from ``collection.scan`` when ``reads`` names the
+    fields ``group`` reads; from then on a mutation adjusts a few counters
+    and ``counts`` costs O(distinct values) however many records there are.
+    """
+
+    def __init__(self, collection, group, fields, reads=None):
+        self._collection = collection
+        self._group = group
+        self._fields = tuple(fields)
+        self._reads = reads
+        self._counts = None
+        collection.subscribe(self._on_change)
+
+    def _built(self):
+        if self._counts is None:
+            self._counts = {}
+            if self._reads is None:
+                records = iter(self._collection)
+            else:
+                records = self._collection.scan((*self._reads, *self._fields))
+            for record in records:
+                self._count(record, 1)
+        return self._counts
+
+    def _count(self, record, delta):
+        group = self._group(record)
+        if group is None:
+            return
+        counts = self._counts.setdefault(group, Counter())
+        for key in (None, *((f, record.get(f)) for f in self._fields)):
+            try:
+                counts[key] += delta
+            except TypeError:
+                # Unhashable values are not counted, as in IndexedCollection
+                continue
+            if not counts[key]:
+                del counts[key]
+        if not counts:
+            del self._counts[group]
+
+    def _on_change(self, old, new):
+        if self._counts is None:
+            return
+        if old is not None:
+            self._count(old, -1)
+        if new is not None:
+            self._count(new, 1)
+
+    @timed("lookup")
+    def counts(self, group):
+        """Return ``{"total": n, field: {value: n, ...}, ...}`` for ``group``."""
+        counts = self._built().get(group, {})
+        result = {"total": counts.get(None, 0)}
+        result.update((field, {}) for field in self._fields)
+        for key, count in counts.items():
+            if key is not None:
+                result[key[0]][key[1]] = count
+        return result
+
+
+@timed("lookup")
+def paginate(records, limit=None, cursor=None, key="id"):
+    """Return ``(page, next_cursor)`` for records ordered by ``key``.
+
+    ``cursor`` is the key of the last record of the previous page. With a
+    ``limit`` only the smallest ``limit + 1`` keys are selected (a heap,
+    O(n log limit)); ``next_cursor`` is ``None`` on the last page.
+    """
+    get_key = itemgetter(key)
+    if cursor is not None:
+        records = [record for record in records if get_key(record) > cursor]
+    if limit is None:
+        return sorted(records, key=get_key), None
+    page = heapq.nsmallest(limit + 1, records, key=get_key)
+    if len(page) > limit:
+        return page[:limit], get_key(page[limit - 1])
+    return page, None
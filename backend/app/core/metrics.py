@@ -0,0 +1,180 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain dicts keyed by label values, so
+recording a sample is a dict lookup and an addition. Gauges can also take a
+``collect`` callback that reads a value (a collection size, a queue depth)
+when ``/metrics`` is scraped, which keeps such values off the request path.
+"""
+
+import bisect
+import math
+import time
+
+# Seconds; spans fast in-memory lookups up to slow fsync-bound writes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class Counter:
+    """A total that only grows, kept here or read by ``collect`` on scrape.
+
+    ``collect`` returns a number for an unlabelled metric, or a mapping of
+    label value tuples to numbers.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        if self.collect is not None:
+            values = self.collect()
+            self.values = values if isinstance(values, dict) else {(): values}
+        for labels, value in list(self.values.items()):
+            yield self.name, self.labels, labels, value
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram:
+    """Observations counted into fixed buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # labels -> [count per bucket..., overflow, sum]
+
+    def observe(self, value, *labels):
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        names = self.labels + ("le",)
+        for labels, counts in list(self.values.items()):
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                yield f"{self.name}_bucket", names, labels + (_number(bound),), total
+            total += counts[-2]
+            yield f"{self.name}_bucket", names, labels + ("+Inf",), total
+            yield f"{self.name}_sum", self.labels, labels, counts[-1]
+            yield f"{self.name}_count", self.labels, labels, total
+
+
+class Registry:
+    """The set of metrics served by one ``/metrics`` endpoint."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=(), collect=None):
+        return self.register(Counter(name, help, labels, collect))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self.register(Gauge(name, help, labels, collect))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_names, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests per route, method and status.
+
+    Routes are labelled by their path template (``/api/tasks/{task_id}``),
+    so label cardinality stays bounded; unmatched paths share one label.
+    Latency is measured to the start of the response, which for streamed
+    responses (SSE, exports) is the time to first byte rather than the
+    lifetime of the stream. ``in_flight`` covers the whole request,
+    streaming included.
+    """
+
+    def __init__(self, app, requests, latency, in_flight):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.in_flight = in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            labels = (scope["method"], path)
+            self.latency.observe(time.perf_counter() - start, *labels)
+            self.requests.inc(*labels, str(status))
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            self.in_flight.dec()
+            if not recorded:
+                # The app raised before responding; the server answers 500
+                record(500)
@@ -0,0 +1,96 @@
+"""Typed, slot-based record classes for users, projects and tasks.
+
+Records are stored in the in-memory collections as instances of these
+classes instead of dicts: ``__slots__`` removes the per-instance
+``__dict__``, which roughly halves resident memory per record. They keep
+a small read/write mapping interface (``record["id"]``, ``get``, ``keys``,
+``update``) so indexes, storage engines and serializers treat them like the
+dicts they replace; ``from_dict``/``to_dict`` convert at the edges.
+"""
+
+from dataclasses import MISSING, dataclass, fields
+from typing import Optional
+
+
+class Record:
+    __slots__ = ()
+    _fields = ()
+    _defaults = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from stored data, ignoring unknown keys."""
+        return cls(**{key: value for key, value in data.items() if key in cls._fields})
+
+    @classmethod
+    def defaults(cls):
+        """Values ``from_dict`` fills in for fields missing from the data."""
+        return cls._defaults
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+    def keys(self):
+        return self._fields
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def update(self, changes):
+        for key, value in changes.items():
+            if key not in self._fields:
+                raise KeyError(f"{type(self).__name__} has no field {key!r}")
+            setattr(self, key, value)
+
+
+def record(cls):
+    """Class decorator: a slots dataclass with the ``Record`` interface."""
+    cls = dataclass(slots=True)(cls)
+    cls._fields = tuple(field.name for field in fields(cls))
+    cls._defaults = {
+        field.name: field.default
+        for field in fields(cls)
+        if field.default is not MISSING
+    }
+    return cls
+
+
+@record
+class User(Record):
+    id: int
+    username: str
+    email: str
+    password: str
+    full_name: Optional[str] = None
+    created_at: Optional[str] = None
+
+
+@record
+class Project(Record):
+    id: int
+    title: str
+    description: str = ""
+    status: str = "active"
+    owner_id: Optional[int] = None
+    created_at: Optional[str] = None
+
+
+@record
+class Task(Record):
+    id: int
+    title: str
+    description: str = ""
+    project_id: Optional[int] = None
+    assigned_to: Optional[int] = None
+    status: str = "todo"
+    priority: str = "medium"
+    created_at: Optional[str] = None
+    due_date: Optional[str] = None
@@ -0,0 +1,174 @@
+"""Opt-in request profiling: phase timings and cProfile breakdowns.
+
+Code marks its phases with ``span(name)`` blocks or the ``timed(name)``
+decorator. Time spent in each phase is added to the timings of the request
+being handled, held in a context variable; outside a sampled request the
+variable is unset and a span costs a single lookup.
+
+``ProfilingMiddleware`` samples requests, reports their phases in a
+``Server-Timing`` header, and runs ``cProfile`` around one sampled request
+at a time. Requests slower than the threshold are logged and kept for
+inspection.
+"""
+
+import cProfile
+import functools
+import io
+import pstats
+import random
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+_timings = ContextVar("request_timings", default=None)
+
+
+class span:
+    """Context manager adding the time spent in its block to phase ``name``."""
+
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _timings.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            elapsed = time.perf_counter() - self.start
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+
+
+def timed(name):
+    """Decorator counting every call of a (synchronous) function as ``name``."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+        return wrapper
+
+    return decorate
+
+
+def server_timing(timings, total):
+    """``Server-Timing`` header value for phase timings in seconds."""
+    metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    metrics.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling a sample of requests.
+
+    Each request is sampled with probability ``sample_rate``. Sampled
+    requests collect span timings and get a ``Server-Timing`` header; one
+    of them at a time also runs under ``cProfile`` (the profiler sees the
+    event loop thread, so other requests interleaved with it show up too).
+    Sampled requests taking at least ``threshold`` seconds are printed and
+    appended to ``reports``, newest last.
+
+    Like ``MetricsMiddleware``, a request is measured to the start of its
+    response, and the profiler stops there too: a streamed response (SSE,
+    exports) would otherwise hold the profiler, and count as slow, for as
+    long as the stream stays open.
+    """
+
+    def __init__(self, app, sample_rate, threshold, reports, top=15):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.reports = reports
+        self.top = top
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+        timings = {}
+        token = _timings.set(timings)
+        profiler = self._start_profiler()
+        start = time.perf_counter()
+        finished = False
+
+        def finish(status):
+            nonlocal finished
+            finished = True
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            if elapsed >= self.threshold:
+                self._report(scope, status, elapsed, timings, profiler)
+            return elapsed
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing(timings, finish(message["status"]))
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode("latin-1")),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            if not finished:
+                # The app raised before responding; the server answers 500
+                finish(500)
+
+    def _start_profiler(self):
+        if self._profiling:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) owns the hook
+            return None
+        self._profiling = True
+        return profiler
+
+    def _report(self, scope, status, elapsed, timings, profiler):
+        route = scope.get("route")
+        report = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route.path if route is not None else None,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "spans_ms": {
+                name: round(seconds * 1000, 2) for name, seconds in timings.items()
+            },
+            "profile": None,
+        }
+        if profiler is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            report["profile"] = out.getvalue()
+        self.reports.append(report)
+        phases = ", ".join(f"{k}={v}ms" for k, v in report["spans_ms"].items())
+        print(
+            f"🐢 Slow request: {report['method']} {report['path']} -> {status}"
+            f" in {report['duration_ms']}ms ({phases or 'no spans'})"
+        )
@@ -0,0 +1,176 @@
+"""SQLAlchemy repositories and the ``sql`` storage engine.
+
+The engine is durable storage only: the app loads every table into memory
+at startup and answers all queries from its in-memory indexes, while the
+database receives the writes. It backs a single worker; multi-worker mode
+needs the journal engine. The tables mirror the records kept in
+``app.main``, with the foreign keys (``owner_id``, ``assigned_to``,
+``project_id``) indexed for ad-hoc SQL queries. ``id_sequences`` keeps the
+highest id each collection has held, so deleted ids are not reused.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, delete, select
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.core.storage import StorageEngine
+
+
+class UserRow(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    email = Column(String(255), unique=True, index=True, nullable=False)
+    username = Column(String(255), nullable=False)
+    password = Column(String(255), nullable=False)
+    full_name = Column(String(255))
+    created_at = Column(String(64))
+
+
+class ProjectRow(Base):
+    __tablename__ = "projects"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text)
+    status = Column(String(32))
+    owner_id = Column(Integer, index=True)
+    created_at = Column(String(64))
+
+
+class TaskRow(Base):
+    __tablename__ = "tasks"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text)
+    project_id = Column(Integer, index=True)
+    assigned_to = Column(Integer, index=True)
+    status = Column(String(32))
+    priority = Column(String(32))
+    created_at = Column(String(64))
+    due_date = Column(String(64))
+
+
+class IdSequenceRow(Base):
+    __tablename__ = "id_sequences"
+
+    collection = Column(String(64), primary_key=True)
+    max_id = Column(Integer, nullable=False)
+
+
+class Repository:
+    """Loads and writes one table, translating rows to and from record dicts.
+
+    ``key_column`` is the column the in-memory collection is keyed by.
+    """
+
+    model = None
+    key_column = "id"
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._columns = [column.name for column in self.model.__table__.columns]
+
+    def to_record(self, row):
+        return {name: getattr(row, name) for name in self._columns}
+
+    def all(self):
+        statement = select(self.model).order_by(self.model.id)
+        return [self.to_record(row) for row in self.db.scalars(statement)]
+
+    def upsert(self, record):
+        values = {name: record.get(name) for name in self._columns}
+        self.db.merge(self.model(**values))
+
+    def delete(self, key):
+        column = getattr(self.model, self.key_column)
+        self.db.execute(delete(self.model).where(column == key))
+
+
+class UserRepository(Repository):
+    model = UserRow
+    key_column = "email"
+
+
+class ProjectRepository(Repository):
+    model = ProjectRow
+
+
+class TaskRepository(Repository):
+    model = TaskRow
+
+
+REPOSITORIES = {
+    "users": UserRepository,
+    "projects": ProjectRepository,
+    "tasks": TaskRepository,
+}
+
+
+class SqlStorage(StorageEngine):
+    """Storage engine persisting each batch of ops in one transaction.
+
+    Write-behind only: ``load`` reads everything once and nothing queries
+    the tables afterwards, so changes made by another process are not seen.
+    """
+
+    name = "sql"
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+
+    def session(self):
+        return Session(self.engine, autoflush=False)
+
+    def load(self):
+        Base.metadata.create_all(self.engine)
+        state = {}
+        with self.session() as db:
+            for name, repository_class in REPOSITORIES.items():
+                repository = repository_class(db)
+                state[name] = {
+                    record[repository.key_column]: record for record in repository.all()
+                }
+                self._note_ids(name, state[name])
+            for row in db.scalars(select(IdSequenceRow)):
+                self._note_ids(row.collection, (row.max_id,))
+        return state
+
+    def _note_ids(self, collection, keys):
+        ids = [key for key in keys if isinstance(key, int)]
+        if ids and max(ids) > self.max_ids.get(collection, 0):
+            self.max_ids[collection] = max(ids)
+
+    def encode(self, ops):
+        # Copy records so the writer thread sees them as of this mutation
+        return [
+            (op, collection, key, dict(record) if record is not None else None)
+            for op, collection, key, record in ops
+        ]
+
+    def write(self, payload):
+        self.write_many([payload])
+
+    def write_many(self, payloads):
+        with self.session() as db, db.begin():
+            repositories = {name: cls(db) for name, cls in REPOSITORIES.items()}
+            put_ids = {}
+            for ops in payloads:
+                for op, collection, key, record in ops:
+                    if op == "put":
+                        repositories[collection].upsert(record)
+                        if isinstance(key, int):
+                            put_ids.setdefault(collection, []).append(key)
+                    else:
+                        repositories[collection].delete(key)
+            for collection, ids in put_ids.items():
+                sequence = db.get(IdSequenceRow, collection)
+                if sequence is None:
+                    db.add(IdSequenceRow(collection=collection, max_id=max(ids)))
+                elif max(ids) > sequence.max_id:
+                    sequence.max_id = max(ids)
+
+    def close(self):
+        self.engine.dispose()
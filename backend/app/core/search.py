@@ -0,0 +1,189 @@
+"""Incremental inverted index behind the global search endpoint."""
+
+import heapq
+import re
+
+from app.core.profiling import timed
+
+TOKEN_RE = re.compile(r"\w+")
+GRAM_SIZE = 3
+
+# Per-term scores by how the query term matched an indexed token
+EXACT, PREFIX, SUBSTRING = 3, 2, 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+def _grams(token):
+    """All 1..3 character grams of ``token``."""
+    grams = set()
+    for size in range(1, GRAM_SIZE + 1):
+        for start in range(len(token) - size + 1):
+            grams.add(token[start : start + size])
+    return grams
+
+
+class SearchIndex:
+    """Token inverted index with an n-gram index over the vocabulary.
+
+    Documents are ``(kind, id)`` pairs built from weighted text fields.
+    A query term is resolved to vocabulary tokens through the gram index
+    (so substring and prefix matches need no corpus scan), then to the
+    documents containing those tokens. Work is proportional to the number
+    of matching tokens and documents rather than the size of the corpus.
+
+    Watched collections are indexed by the first search, not when watched,
+    so start-up does not pay for indexing data nobody searches.
+    """
+
+    def __init__(self):
+        self._postings = {}  # token -> {(kind, id): field weight}
+        self._grams = {}  # gram -> {tokens}
+        self._documents = {}  # (kind, id) -> {tokens}
+        self._fields = {}  # kind -> {field: weight}
+        self._unindexed = {}  # kind -> watched collection not yet indexed
+
+    def __len__(self):
+        self._index_watched()
+        return len(self._documents)
+
+    @property
+    def vocabulary_size(self):
+        self._index_watched()
+        return len(self._postings)
+
+    def stats(self):
+        """Current sizes, without building indexes for unsearched collections."""
+        return {
+            "documents": len(self._documents),
+            "terms": len(self._postings),
+            "grams": len(self._grams),
+            "unindexed": len(self._unindexed),
+        }
+
+    def watch(self, collection, kind, fields):
+        """Index ``collection`` under ``kind`` and follow its mutations.
+
+        ``fields`` maps record field names to ranking weights.
+        """
+        self._fields[kind] = fields
+        self._unindexed[kind] = collection
+        key_field = collection.primary_key
+
+        def on_change(old, new):
+            if kind in self._unindexed:
+                return
+            if old is not None:
+                self.remove(kind, old[key_field])
+            if new is not None:
+                self.add(kind, new[key_field], new)
+
+        collection.subscribe(on_change)
+
+    def _index_watched(self):
+        while self._unindexed:
+            kind, collection = self._unindexed.popitem()
+            key_field = collection.primary_key
+            for record in collection:
+                self.add(kind, record[key_field], record)
+
+    def add(self, kind, doc_id, record):
+        doc = (kind, doc_id)
+        if doc in self._documents:
+            self.remove(kind, doc_id)
+        tokens = {}
+        for field, weight in self._fields[kind].items():
+            for token in tokenize(record.get(field)):
+                tokens[token] = max(tokens.get(token, 0), weight)
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for gram in _grams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+            postings[doc] = weight
+        self._documents[doc] = set(tokens)
+
+    def remove(self, kind, doc_id):
+        doc = (kind, doc_id)
+        for token in self._documents.pop(doc, ()):
+            postings = self._postings[token]
+            postings.pop(doc, None)
+            if not postings:
+                del self._postings[token]
+                for gram in _grams(token):
+                    tokens = self._grams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._grams[gram]
+
+    def _matching_tokens(self, term):
+        grams = [term] if len(term) <= GRAM_SIZE else _grams_of_size(term)
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self._grams.get(g, ()))):
+            tokens = self._grams.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return [token for token in candidates if term in token]
+
+    def _score_term(self, term, kinds):
+        scores = {}
+        for token in self._matching_tokens(term):
+            if token == term:
+                match = EXACT
+            elif token.startswith(term):
+                match = PREFIX
+            else:
+                match = SUBSTRING
+            for doc, weight in self._postings[token].items():
+                if doc[0] in kinds:
+                    score = match * weight
+                    if score > scores.get(doc, 0):
+                        scores[doc] = score
+        return scores
+
+    @timed("search")
+    def search(self, query, kinds, limit=20):
+        """Return ``{kind: [(score, id), ...]}`` for the top ``limit`` hits.
+
+        Every query term must match (as a prefix or substring of some token
+        in the document); scores are summed across terms.
+        """
+        self._index_watched()
+        results = {kind: [] for kind in kinds}
+        terms = tokenize(query)
+        if not terms:
+            return results
+        scores = None
+        # Resolve the most selective terms first so the intersection shrinks fast
+        for term in sorted(set(terms), key=len, reverse=True):
+            term_scores = self._score_term(term, kinds)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    doc: score + term_scores[doc]
+                    for doc, score in scores.items()
+                    if doc in term_scores
+                }
+            if not scores:
+                return results
+        by_kind = {kind: [] for kind in kinds}
+        for (kind, doc_id), score in scores.items():
+            by_kind[kind].append((score, doc_id))
+        for kind, hits in by_kind.items():
+            # Highest score first; ties go to the most recently created id
+            results[kind] = heapq.nlargest(limit, hits, key=_rank_key)
+        return results
+
+
+def _grams_of_size(term):
+    return {term[i : i + GRAM_SIZE] for i in range(len(term) - GRAM_SIZE + 1)}
+
+
+def _rank_key(hit):
+    score, doc_id = hit
+    return (score, doc_id if isinstance(doc_id, int) else 0)
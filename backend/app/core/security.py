@@ -1,43 +1,130 @@
-from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+"""Password hashing off the event loop, with a calibrated work factor.
+
+Hashes are PBKDF2-HMAC-SHA256 strings in the form
+``pbkdf2_sha256$<iterations>$<salt>$<hash>``. ``hashlib.pbkdf2_hmac`` releases
+the GIL, so a small thread pool hashes in parallel while the event loop keeps
+serving other requests. Stored passwords in any other form (the plaintext
+written by earlier versions) still verify and are flagged for rehashing.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = "pbkdf2_sha256"
+MIN_ITERATIONS = 10_000
+SALT_BYTES = 16
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should retry later."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
 
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
 
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+
+def calibrate(target_ms, sample_iterations=20_000):
+    """Iteration count for which one hash takes about ``target_ms``."""
+    start = time.perf_counter()
+    _derive("calibration", b"\0" * SALT_BYTES, sample_iterations)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    iterations = int(sample_iterations * (target_ms / 1000) / elapsed)
+    # Round so small timing jitter between restarts does not force rehashes
+    return max(MIN_ITERATIONS, round(iterations, -4))
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded thread pool.
+
+    At most ``workers`` hashes run at once, and at most ``max_pending``
+    may be queued or running; beyond that ``hash_async``/``verify_async``
+    raise ``HasherBusy`` straight away instead of letting a login storm
+    queue unbounded work. ``iterations`` defaults to a calibration against
+    ``target_ms``.
+    """
+
+    def __init__(self, iterations=None, target_ms=50, workers=2, max_pending=64):
+        self.iterations = iterations or calibrate(target_ms)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._dummy = None
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
         )
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
-    except JWTError:
-        return None
 
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        digest = _derive(password, salt, self.iterations)
+        return f"{ALGORITHM}${self.iterations}${_b64(salt)}${_b64(digest)}"
+
+    def dummy_hash(self):
+        """Hash of a random password at the current work factor."""
+        if self._dummy is None or self._dummy.split("$")[1] != str(self.iterations):
+            self._dummy = self.hash(_b64(os.urandom(SALT_BYTES)))
+        return self._dummy
+
+    def verify(self, password, stored):
+        """Return ``(matches, needs_rehash)`` for a stored password.
+
+        ``stored=None`` (no such account) checks against ``dummy_hash()``
+        and never matches, so it costs as much as a wrong password.
+        """
+        if stored is None:
+            self.verify(password, self.dummy_hash())
+            return False, False
+        parts = stored.split("$") if stored else []
+        if len(parts) != 4 or parts[0] != ALGORITHM:
+            # Legacy plaintext entry
+            matches = bool(stored) and hmac.compare_digest(
+                password.encode("utf-8"), stored.encode("utf-8")
+            )
+            return matches, matches
+        _, iterations, salt, digest = parts
+        candidate = _derive(password, _unb64(salt), int(iterations))
+        matches = hmac.compare_digest(candidate, _unb64(digest))
+        # Only upgrade: workers that calibrated slightly differently must not
+        # keep rehashing each other's output
+        return matches, matches and int(iterations) < self.iterations
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash_async(self, password):
+        return await self._run(self.hash, password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    async def verify_async(self, password, stored):
+        return await self._run(self.verify, password, stored)
 
+    def stats(self):
+        return {
+            "algorithm": ALGORITHM,
+            "iterations": self.iterations,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    def close(self):
+        self._pool.shutdown(wait=False)
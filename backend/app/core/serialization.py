@@ -0,0 +1,51 @@
+"""JSON encoding shared by API responses and the storage engines.
+
+Uses orjson when it is installed and the standard library otherwise; both
+paths produce compact UTF-8 bytes, encode records from ``app.core.models``
+as objects, and fall back to ``str`` for values JSON has no type for.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.core.profiling import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj):
+    to_dict = getattr(obj, "to_dict", None)
+    return to_dict() if to_dict is not None else str(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj) -> bytes:
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with ``dumps``; the app's default class."""
+
+    @timed("serialize")
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
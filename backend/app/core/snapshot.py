@@ -0,0 +1,276 @@
+"""Binary snapshot format, memory-mapped and decoded lazily on load.
+
+Layout (integers little-endian)::
+
+    magic     8 bytes  b"CCSNAP\\x00\\x02"
+    length    u64      size of the header
+    header    JSON     {"version": 2, <metadata>, "collections": {
+                           name: {"keys": [...], "offsets": <file offset>,
+                                  "columns": {field: {"values": [...],
+                                                      "codes": <file offset>}}}}}
+    per collection:
+      offsets  (count + 1) x u64   file offsets of each record and the end
+      records  one JSON document per record, back to back
+      codes    count x u32 per column, indexes into the column's "values"
+
+Loading maps the file and reads only the header and the offset tables;
+each record is a ``EncodedRecord`` placeholder until first accessed, so
+start-up cost does not depend on the size of the records. Columns are
+dictionary-encoded copies of selected fields (the indexed ones), from
+which indexes are built without decoding a single record; ``ABSENT_CODE``
+marks a record without the field. The metadata fields are the storage
+engine's (id high-water marks, journal generation) and are returned next
+to the state by ``open_snapshot``.
+"""
+
+import mmap
+import os
+import sys
+from array import array
+
+from app.core.indexes import MISSING, Deferred
+from app.core.serialization import dumps, loads
+
+MAGIC = b"CCSNAP\x00\x02"
+ABSENT_CODE = 0xFFFFFFFF
+_LENGTH_SIZE = 8
+_PLACEHOLDER = 10**15
+
+
+class ColumnTable:
+    """Dictionary-encoded values of some fields of one collection, by row."""
+
+    __slots__ = ("_columns",)
+
+    def __init__(self, columns):
+        self._columns = columns  # field -> (distinct values, codes)
+
+    def group(self, name, keys, rows):
+        """``[(value, [key, ...]), ...]`` of ``name`` over ``rows``.
+
+        Records without the field are grouped under ``MISSING``. Returns
+        ``None`` if ``name`` is not stored.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            return None
+        values, codes = column
+        groups = [[] for _ in values]
+        absent = []
+        for key, row in zip(keys, rows):
+            code = codes[row]
+            (absent if code == ABSENT_CODE else groups[code]).append(key)
+        pairs = [(value, group) for value, group in zip(values, groups) if group]
+        if absent:
+            pairs.append((MISSING, absent))
+        return pairs
+
+    def row(self, row, names):
+        """Values of ``names`` at ``row``, or ``None`` if one is not stored."""
+        values = []
+        for name in names:
+            column = self._columns.get(name)
+            if column is None:
+                return None
+            code = column[1][row]
+            values.append(MISSING if code == ABSENT_CODE else column[0][code])
+        return values
+
+
+class EncodedRecord(Deferred):
+    """A record still encoded in the mapped snapshot file."""
+
+    __slots__ = ("_data", "_start", "_end", "_table", "_row")
+
+    def __init__(self, data, start, end, table=None, row=0):
+        self._data = data
+        self._start = start
+        self._end = end
+        self._table = table
+        self._row = row
+
+    def load(self):
+        return loads(self._data[self._start : self._end])
+
+    def raw(self):
+        return self._data[self._start : self._end]
+
+    def fields(self, names):
+        return self._table.row(self._row, names) if self._table is not None else None
+
+    def location(self):
+        return (self._table, self._row) if self._table is not None else None
+
+
+class _ColumnBuilder:
+    """Dictionary-encodes the values of ``names``, one record at a time."""
+
+    def __init__(self, names):
+        self.names = names
+        self._lookups = [{} for _ in names]
+        self._values = [[] for _ in names]
+        self._codes = [array("I") for _ in names]
+        self._usable = [True] * len(names)
+
+    def add(self, values):
+        for i, value in enumerate(values):
+            if value is MISSING:
+                self._codes[i].append(ABSENT_CODE)
+                continue
+            # Keyed by type too, so 1, 1.0 and True stay distinct
+            token = (value.__class__, value)
+            try:
+                code = self._lookups[i].get(token)
+            except TypeError:
+                # Unhashable (e.g. a list); such a field is not indexed anyway
+                self._usable[i] = False
+                code = 0
+            if code is None:
+                code = self._lookups[i][token] = len(self._values[i])
+                self._values[i].append(value)
+            self._codes[i].append(code)
+
+    def columns(self):
+        return {
+            name: (self._values[i], self._codes[i])
+            for i, name in enumerate(self.names)
+            if self._usable[i]
+        }
+
+
+def _encode(record, names):
+    """A record's bytes and the values of ``names`` in those bytes."""
+    if isinstance(record, EncodedRecord):
+        # Copied as is; the column values come from its own snapshot
+        blob = record.raw()
+        values = record.fields(names) if names else ()
+        if values is not None:
+            return blob, values
+    else:
+        if isinstance(record, Deferred):
+            record = record.load()
+        blob = dumps(record)
+        if not names:
+            return blob, ()
+    # Read back from the bytes: a live record may change in the meantime
+    decoded = loads(blob)
+    return blob, [decoded.get(name, MISSING) for name in names]
+
+
+def _array_bytes(typecode, values):
+    table = array(typecode, values)
+    if sys.byteorder != "little":
+        table.byteswap()
+    return table.tobytes()
+
+
+def _read_array(typecode, data, start, count):
+    table = array(typecode)
+    table.frombytes(data[start : start + table.itemsize * count])
+    if sys.byteorder != "little":
+        table.byteswap()
+    return table
+
+
+def write_snapshot(path, state, meta=None, columns=None):
+    """Write ``{collection: {key: record}}`` atomically to ``path``.
+
+    ``meta`` is a dict of extra header fields, and ``columns`` maps
+    collection names to the fields stored as column tables. Records still
+    encoded in an earlier snapshot are copied without being decoded.
+    Returns the size of the file written.
+    """
+    names = list(state)
+    blobs, tables = {}, {}
+    for name in names:
+        builder = _ColumnBuilder(tuple((columns or {}).get(name, ())))
+        blobs[name] = []
+        for record in state[name].values():
+            blob, values = _encode(record, builder.names)
+            blobs[name].append(blob)
+            builder.add(values)
+        tables[name] = builder.columns()
+    header = {
+        "version": 2,
+        **(meta or {}),
+        "collections": {
+            name: {
+                "keys": list(state[name]),
+                "offsets": _PLACEHOLDER,
+                "columns": {
+                    field: {"values": values, "codes": _PLACEHOLDER}
+                    for field, (values, _) in tables[name].items()
+                },
+            }
+            for name in names
+        },
+    }
+    # Offsets depend on the header length, which depends on the offsets;
+    # fixed-width placeholders keep the header size stable across both passes
+    header_bytes = dumps(header)
+    position = len(MAGIC) + _LENGTH_SIZE + len(header_bytes)
+    offsets = {}
+    for name in names:
+        info = header["collections"][name]
+        info["offsets"] = position
+        position += 8 * (len(blobs[name]) + 1)
+        offsets[name] = [position]
+        for blob in blobs[name]:
+            position += len(blob)
+            offsets[name].append(position)
+        for column in info["columns"].values():
+            column["codes"] = position
+            position += 4 * len(blobs[name])
+    header_bytes = dumps(header).ljust(len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(_LENGTH_SIZE, "little"))
+        f.write(header_bytes)
+        for name in names:
+            f.write(_array_bytes("Q", offsets[name]))
+            f.writelines(blobs[name])
+            for _, codes in tables[name].values():
+                f.write(_array_bytes("I", codes))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return position
+
+
+def read_snapshot(path):
+    """Map ``path`` and return ``{collection: {key: EncodedRecord}}``."""
+    return open_snapshot(path)[0]
+
+
+def open_snapshot(path):
+    """Map ``path`` and return ``(state, meta)``; see ``write_snapshot``."""
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+    start = len(MAGIC) + _LENGTH_SIZE
+    length = int.from_bytes(data[len(MAGIC) : start], "little")
+    header = loads(data[start : start + length])
+    state = {}
+    for name, info in header["collections"].items():
+        keys = info["keys"]
+        offsets = _read_array("Q", data, info["offsets"], len(keys) + 1)
+        columns = {
+            field: (
+                column["values"],
+                _read_array("I", data, column["codes"], len(keys)),
+            )
+            for field, column in info.get("columns", {}).items()
+        }
+        table = ColumnTable(columns) if columns else None
+        ends = iter(offsets)
+        next(ends)
+        state[name] = {
+            key: EncodedRecord(data, start, end, table, row)
+            for row, (key, start, end) in enumerate(zip(keys, offsets, ends))
+        }
+    header.pop("version", None)
+    del header["collections"]
+    return state, header
@@ -0,0 +1,829 @@
+"""Persistence engines for the in-memory collections in ``app.main``.
+
+Every engine exposes the same small interface: ``load()`` returns the
+persisted state as ``{collection: {key: record}}`` and ``put``/``delete``
+record a single mutation. ``create_storage`` picks the engine by name.
+"""
+
+import asyncio
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.indexes import Deferred
+from app.core.profiling import span
+from app.core.serialization import dumps, loads
+from app.core.snapshot import EncodedRecord, open_snapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: multi-worker mode is unavailable
+    fcntl = None
+
+# Legacy whole-file layout: collection -> (file name, stored as dict?)
+LEGACY_FILES = {
+    "users": ("users.json", True),
+    "projects": ("projects.json", False),
+    "tasks": ("tasks.json", False),
+}
+COLLECTIONS = tuple(LEGACY_FILES)
+
+
+def load_data(file_path, default_value):
+    """Load data from JSON file"""
+    if file_path is None:
+        return default_value
+    try:
+        if os.path.exists(file_path):
+            with open(file_path, "rb") as f:
+                return loads(f.read())
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+    return default_value
+
+
+def load_legacy_files(data_dir):
+    """Read ``users.json``/``projects.json``/``tasks.json`` into keyed dicts."""
+    state = {}
+    for name, (file_name, keyed) in LEGACY_FILES.items():
+        data = load_data(os.path.join(data_dir, file_name), {} if keyed else [])
+        state[name] = dict(data) if keyed else {r["id"]: r for r in data}
+    return state
+
+
+def _empty_state():
+    return {name: {} for name in COLLECTIONS}
+
+
+def _atomic_write_json(path, data):
+    """Write ``data`` as compact JSON to a temp file and rename it over ``path``.
+
+    Returns the number of bytes written.
+    """
+    tmp_path = path + ".tmp"
+    encoded = dumps(data)
+    with open(tmp_path, "wb") as f:
+        f.write(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(encoded)
+
+
+class StorageEngine:
+    """Base class for persistence backends.
+
+    A mutation is an op tuple ``("put", collection, key, record)`` or
+    ``("del", collection, key, None)``. Writing is split in two phases so
+    it can leave the event loop: ``encode`` runs on the caller's thread and
+    captures everything the write needs, ``write`` does the file I/O and
+    may run on a background thread, and ``sync`` makes it durable.
+
+    ``attach`` registers a callable returning the live state; engines that
+    need the full collections (compaction, whole-file rewrites) call it.
+
+    ``max_ids`` holds, after ``load``, the highest integer key each
+    collection has held, deleted records included, for engines that
+    remember it; others leave it empty and ids follow the loaded records.
+
+    ``sequence`` counts the ops written so far and ``epoch`` names the
+    history it counts in. Engines shared by several workers keep both in
+    the data directory so every worker agrees on them; the others count
+    from 0 in a random epoch per process.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._source = None
+        self.max_ids = {}
+        self.sequence = 0
+        self.epoch = secrets.token_hex(4)
+        self.bytes_written = 0  # for metrics; engines without files leave it at 0
+
+    def attach(self, source):
+        self._source = source
+
+    def load(self):
+        raise NotImplementedError
+
+    def encode(self, ops):
+        return ops
+
+    def write(self, payload):
+        raise NotImplementedError
+
+    def write_many(self, payloads):
+        """Write several encoded payloads, coalescing them where possible."""
+        for payload in payloads:
+            self.write(payload)
+
+    def sync(self):
+        pass
+
+    def put(self, collection, key, record):
+        self.write(self.encode([("put", collection, key, record)]))
+
+    def delete(self, collection, key):
+        self.write(self.encode([("del", collection, key, None)]))
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(StorageEngine):
+    """No-op engine used when no writable data directory is available."""
+
+    name = "memory"
+
+    def load(self):
+        return _empty_state()
+
+    def write(self, payload):
+        pass
+
+
+class JsonFileStorage(StorageEngine):
+    """Legacy engine: rewrites the whole collection file on every mutation."""
+
+    name = "json"
+
+    def __init__(self, data_dir):
+        super().__init__()
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+
+    def load(self):
+        return load_legacy_files(self.data_dir)
+
+    def encode(self, ops):
+        # Copy the touched collections now; the dump may happen on another thread
+        state = self._source()
+        payload = {}
+        for _, collection, _, _ in ops:
+            if collection not in payload:
+                records = state[collection]
+                keyed = LEGACY_FILES[collection][1]
+                payload[collection] = dict(records) if keyed else list(records.values())
+        return payload
+
+    def write(self, payload):
+        for collection, data in payload.items():
+            path = os.path.join(self.data_dir, LEGACY_FILES[collection][0])
+            try:
+                with self._lock:
+                    self.bytes_written += _atomic_write_json(path, data)
+            except Exception as e:
+                print(f"Error saving {path}: {e}")
+
+    def write_many(self, payloads):
+        # Only the newest copy of each collection needs to reach the disk
+        merged = {}
+        for payload in payloads:
+            merged.update(payload)
+        self.write(merged)
+
+
+class JournalStorage(StorageEngine):
+    """Append-only journal with periodic snapshot compaction.
+
+    Each mutation appends one JSON line to ``journal.log``; a multi-op
+    mutation (e.g. a cascade delete) is a single ``batch`` line, so a torn
+    append drops the whole batch rather than part of it. On startup the
+    snapshot is loaded and the journal replayed over it. Once
+    ``compact_every`` entries have accumulated, the live state is written
+    to a new snapshot and an empty journal is renamed into place, so write
+    cost does not depend on the size of the dataset. The snapshot header
+    keeps ``max_ids`` and the journal's put entries raise them, so an id
+    survives compaction even when its record has been deleted.
+
+    Every journal starts with a ``gen`` line numbering it; a snapshot
+    records the generation of the journal that continues it, and how many
+    bytes of the one before it already holds, so a crash between writing
+    the snapshot and replacing the journal loses nothing.
+
+    With ``shared=True`` several worker processes use the same directory.
+    Writers serialize on ``worker_lock``, and every worker tails the
+    journal with ``read_changes`` to pick up entries written by the others.
+    A compaction shows up as a new journal inode; readers finish the old
+    file through their open handle before switching to the new one. A
+    reader that finds a generation missing (compacted twice since its last
+    read) rebuilds from the snapshot instead. ``pending`` counts the ops in
+    the current journal, which every worker reads in full once it holds
+    the lock, and only the lock holder compacts.
+
+    ``sequence`` is kept in the snapshot header and advanced by every op
+    in the journal, so all workers reach the same value at the same point
+    of the journal; the epoch is the content of ``epoch`` in the directory.
+    """
+
+    name = "journal"
+    JOURNAL_FILE = "journal.log"
+    SNAPSHOT_FILE = "snapshot.bin"
+    LEGACY_SNAPSHOT_FILE = "snapshot.json"
+    LOCK_FILE = "journal.lock"
+    EPOCH_FILE = "epoch"
+
+    def __init__(self, data_dir, compact_every=1000, shared=False, columns=None):
+        super().__init__()
+        self.data_dir = data_dir
+        self.compact_every = compact_every
+        # Fields the snapshot stores as column tables, to index without decoding
+        self.columns = columns or {}
+        self.journal_path = os.path.join(data_dir, self.JOURNAL_FILE)
+        self.snapshot_path = os.path.join(data_dir, self.SNAPSHOT_FILE)
+        self.legacy_snapshot_path = os.path.join(data_dir, self.LEGACY_SNAPSHOT_FILE)
+        self.lock_path = os.path.join(data_dir, self.LOCK_FILE)
+        self.shared = shared
+        self.worker_lock = WorkerLock(self.lock_path) if shared else None
+        self.pending = 0
+        self.generation = 0  # of the journal currently open
+        self._lock = threading.Lock()
+        self._journal = None
+        self._reader = None
+        self._offset = 0  # bytes of the current journal already applied
+
+    def load(self):
+        imported = False
+        meta = {}
+        if os.path.exists(self.snapshot_path):
+            # Records stay encoded in the mapped file until first accessed
+            state = _empty_state()
+            snapshot, meta = open_snapshot(self.snapshot_path)
+            state.update(snapshot)
+            self.max_ids = dict(meta.get("max_ids", {}))
+            self.sequence = meta.get("sequence", 0)
+        elif os.path.exists(self.legacy_snapshot_path):
+            state = self._read_legacy_snapshot()
+        elif os.path.exists(self.journal_path):
+            state = _empty_state()
+        else:
+            # First start on this directory: import the legacy JSON files
+            state = load_legacy_files(self.data_dir)
+            imported = any(state.values())
+        # Older snapshots and the legacy files only have their records' keys
+        for name, records in state.items():
+            for key in records:
+                self._note_id(name, key)
+        if imported:
+            self._write_snapshot(state, {"max_ids": dict(self.max_ids)})
+        self.epoch = self._read_epoch()
+        self.pending, self.generation = self._replay(
+            state, meta.get("generation", 0), meta.get("compacted_bytes", 0)
+        )
+        self.sequence += self.pending
+        self._open_journal()
+        if self._offset == 0:
+            self._journal.write(_generation_line(self.generation))
+            self._journal.flush()
+            self._offset = self._journal.tell()
+        return state
+
+    def _read_epoch(self):
+        """The directory's epoch, created by the first worker to load it."""
+        path = os.path.join(self.data_dir, self.EPOCH_FILE)
+        try:
+            with open(path, "x") as f:
+                f.write(self.epoch)
+            return self.epoch
+        except FileExistsError:
+            with open(path) as f:
+                return f.read().strip() or self.epoch
+
+    def _open_journal(self):
+        self._journal = open(self.journal_path, "ab")
+        self._offset = self._journal.tell()
+        if self.shared:
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = open(self.journal_path, "rb")
+
+    def _read_tail(self):
+        """Parse the complete lines after ``_offset`` in the reader's file."""
+        self._reader.seek(self._offset)
+        data = self._reader.read()
+        # A line still being appended by another worker is left for next time
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        entries = []
+        for line in data[:end].splitlines():
+            try:
+                entries.append(loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def read_changes(self):
+        """Return ops appended by other workers since the last call.
+
+        Costs a single ``stat`` when nothing has changed.
+        """
+        if not self.shared:
+            return []
+        with self._lock:
+            try:
+                stat = os.stat(self.journal_path)
+            except FileNotFoundError:
+                return []
+            rotated = stat.st_ino != os.fstat(self._reader.fileno()).st_ino
+            if not rotated and stat.st_size == self._offset:
+                return []
+            ops = _ops(self._read_tail())
+            if not rotated:
+                self.pending += len(ops)
+            else:
+                self._journal.close()
+                self._open_journal()
+                self._offset = 0
+                entries = self._read_tail()
+                if _journal_generation(entries) != self.generation + 1:
+                    return self._reload()
+                self.generation += 1
+                # Only ops of the current journal count towards compaction
+                fresh = _ops(entries)
+                self.pending = len(fresh)
+                ops.extend(fresh)
+            self.sequence += len(ops)
+            for op, collection, key, _ in ops:
+                if op == "put":
+                    self._note_id(collection, key)
+        return ops
+
+    def _reload(self):
+        """Ops turning the live state into the snapshot plus its journal.
+
+        For a reader that missed a whole journal: other workers compacted
+        more than once since it last read. Called with ``_lock`` held.
+        """
+        for _ in range(10):
+            snapshot, meta = open_snapshot(self.snapshot_path)
+            generation = meta.get("generation", 0)
+            self._journal.close()
+            self._open_journal()
+            self._offset = 0
+            entries = self._read_tail()
+            current = _journal_generation(entries)
+            if current == generation - 1:
+                # The compaction has not replaced the journal (yet)
+                self._offset = meta.get("compacted_bytes", 0)
+                entries = self._read_tail()
+            if current in (generation, generation - 1):
+                break
+            # Another compaction replaced a file in between; read them again
+        else:
+            print(f"⚠️ Warning: {self.journal_path} does not follow the snapshot")
+        state = _empty_state()
+        state.update(snapshot)
+        for collection, max_id in meta.get("max_ids", {}).items():
+            self._note_id(collection, max_id)
+        self.pending = 0
+        for entry in entries:
+            for op in _expand(entry):
+                self._apply(state, op)
+                self.pending += 1
+        self.generation = current
+        self.sequence = max(self.sequence, meta.get("sequence", 0) + self.pending)
+        return _diff(self._source(), state)
+
+    def _note_id(self, collection, key):
+        if isinstance(key, int) and key > self.max_ids.get(collection, 0):
+            self.max_ids[collection] = key
+
+    def _read_legacy_snapshot(self):
+        """Read a version 1 (JSON) snapshot; the next compaction replaces it."""
+        with open(self.legacy_snapshot_path, "rb") as f:
+            data = loads(f.read())
+        state = _empty_state()
+        for name, pairs in data.get("collections", {}).items():
+            state[name] = {key: record for key, record in pairs}
+        return state
+
+    def _write_snapshot(self, state, meta):
+        self.bytes_written += write_snapshot(
+            self.snapshot_path, state, meta, self.columns
+        )
+        if os.path.exists(self.legacy_snapshot_path):
+            os.remove(self.legacy_snapshot_path)
+
+    def _replay(self, state, generation, compacted_bytes):
+        """Apply the journal to ``state``; returns ``(ops, its generation)``."""
+        if not os.path.exists(self.journal_path):
+            return 0, generation
+        count = 0
+        with open(self.journal_path, "rb") as f:
+            try:
+                current = _journal_generation([loads(f.readline())])
+            except ValueError:
+                current = 0
+            if current == generation - 1:
+                # Compaction stopped before replacing the journal; the
+                # snapshot already holds its first compacted_bytes
+                f.seek(compacted_bytes)
+            else:
+                if current != generation:
+                    print(
+                        f"⚠️ Warning: {f.name} has generation {current}, the"
+                        f" snapshot expects {generation}; replaying it anyway"
+                    )
+                f.seek(0)
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; drop it
+                    print(f"⚠️ Warning: skipping corrupt journal entry in {f.name}")
+                    continue
+                for op in _expand(entry):
+                    self._apply(state, op)
+                    count += 1
+        return count, current
+
+    def _apply(self, state, entry):
+        records = state.setdefault(entry["c"], {})
+        if entry["op"] == "put":
+            records[entry["k"]] = entry["v"]
+            self._note_id(entry["c"], entry["k"])
+        else:
+            records.pop(entry["k"], None)
+
+    def encode(self, ops):
+        entries = []
+        for op, collection, key, record in ops:
+            entry = {"op": op, "c": collection, "k": key}
+            if op == "put":
+                entry["v"] = record
+                self._note_id(collection, key)
+            entries.append(entry)
+        if len(entries) > 1:
+            entries = [{"op": "batch", "ops": entries}]
+        data = b"".join(dumps(entry) + b"\n" for entry in entries)
+        snapshot = None
+        self.pending += len(ops)
+        self.sequence += len(ops)
+        if (
+            self.pending >= self.compact_every
+            and self._source is not None
+            # Another worker may be mid-write; it will compact instead
+            and (not self.shared or self.worker_lock.held)
+        ):
+            # Shallow copies taken here already include every op encoded so far
+            state = {name: dict(records) for name, records in self._source().items()}
+            snapshot = (state, dict(self.max_ids), self.sequence)
+            self.pending = 0
+        return data, snapshot
+
+    def write(self, payload):
+        self.write_many([payload])
+
+    def write_many(self, payloads):
+        # One write() call per run of entries; a compaction splits the run
+        chunk = []
+        with self._lock:
+            for data, snapshot in payloads:
+                chunk.append(data)
+                if snapshot is not None:
+                    self._append(chunk)
+                    chunk = []
+                    state, max_ids, sequence = snapshot
+                    meta = {
+                        "max_ids": max_ids,
+                        "sequence": sequence,
+                        "generation": self.generation + 1,
+                        "compacted_bytes": self._journal.tell(),
+                    }
+                    self._write_snapshot(state, meta)
+                    self._rotate()
+            if chunk:
+                self._append(chunk)
+
+    def _append(self, chunk):
+        data = b"".join(chunk)
+        self._journal.write(data)
+        self.bytes_written += len(data)
+        self._journal.flush()
+        # Our own entries are already applied in memory
+        self._offset = self._journal.tell()
+
+    def _rotate(self):
+        """Replace the journal with the next generation's (a new inode)."""
+        self.generation += 1
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_generation_line(self.generation))
+        os.replace(tmp_path, self.journal_path)
+        self._journal.close()
+        self._open_journal()
+
+    def sync(self):
+        with self._lock:
+            os.fsync(self._journal.fileno())
+
+    def compact(self):
+        if self._source is not None:
+            self.pending = self.compact_every
+            self.write(self.encode([]))
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+        if self.worker_lock is not None:
+            self.worker_lock.close()
+
+
+def _expand(entry):
+    """The single ops recorded by one journal line."""
+    if entry["op"] == "batch":
+        return entry["ops"]
+    return () if entry["op"] == "gen" else (entry,)
+
+
+def _ops(entries):
+    return [
+        (e["op"], e["c"], e["k"], e.get("v"))
+        for entry in entries
+        for e in _expand(entry)
+    ]
+
+
+def _generation_line(generation):
+    return dumps({"op": "gen", "g": generation}) + b"\n"
+
+
+def _journal_generation(entries):
+    """Generation of a journal from its parsed lines; 0 for older journals."""
+    if entries and entries[0].get("op") == "gen":
+        return entries[0]["g"]
+    return 0
+
+
+def _diff(live, state):
+    """Ops turning ``live`` into ``state``, both ``{collection: {key: record}}``."""
+    ops = []
+    for name, records in state.items():
+        current = live.get(name, {})
+        ops.extend(("del", name, key, None) for key in current if key not in records)
+        for key, record in records.items():
+            old = current.get(key)
+            if isinstance(record, Deferred):
+                # Records carried over from the same snapshot bytes are equal
+                if isinstance(old, EncodedRecord) and old.raw() == record.raw():
+                    continue
+                record = record.load()
+            if isinstance(old, Deferred):
+                old = old.load()
+            if old is None or any(old.get(f) != v for f, v in record.items()):
+                ops.append(("put", name, key, record))
+    return ops
+
+
+class WorkerLock:
+    """Exclusive lock shared by every worker process using a data directory.
+
+    Combines an ``asyncio.Lock`` (one coroutine per process waits for the
+    file lock) with ``fcntl.flock``, which is acquired on an executor
+    thread so waiting never blocks the event loop. Use ``async with`` from
+    request handlers, or ``with`` during startup.
+    """
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError("Multi-worker mode needs fcntl (POSIX only)")
+        self.path = path
+        self.held = False
+        self._local = asyncio.Lock()
+        self._file = open(path, "a+b")
+
+    def acquire(self):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self.held = True
+
+    def release(self):
+        self.held = False
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self._local.acquire()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.acquire)
+        except BaseException:
+            self._local.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+        self._local.release()
+
+
+class StorageWriter:
+    """Runs storage writes on a dedicated thread fed by a bounded queue.
+
+    ``durability`` controls what a caller waits for:
+
+    * ``"fsync"`` - the write is fsynced on its own before returning.
+    * ``"group"`` - writes are coalesced and share one fsync (group commit).
+    * ``"async"`` - fire-and-forget; the caller does not wait at all.
+
+    The default applies to every write; ``persist`` accepts a per-call
+    override so a request waits only for the level it asked for.
+
+    Group and async writes are coalesced: after the first one arrives the
+    writer keeps collecting for up to ``window`` seconds or ``max_ops``
+    operations, then hands the whole batch to the engine as one write.
+    """
+
+    MODES = ("fsync", "group", "async")
+
+    def __init__(
+        self, engine, durability="group", max_queue=10000, window=0.002, max_ops=256
+    ):
+        if durability not in self.MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.engine = engine
+        self.durability = durability
+        self.window = window
+        self.max_ops = max_ops
+        self.batches = 0
+        # Called on the writer thread with the seconds each commit took
+        self.on_commit = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="storage-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, ops, durability=None):
+        """Encode ``ops`` and queue them; returns a ``concurrent.futures.Future``.
+
+        Blocks when the queue is full; async callers should use ``persist``.
+        """
+        item = self._item(ops, durability)
+        self._queue.put(item)
+        return item[2]
+
+    def _item(self, ops, durability):
+        mode = durability or self.durability
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown durability mode: {mode}")
+        if self._closed:
+            raise RuntimeError("Storage writer is closed")
+        return (self.engine.encode(ops), mode, Future(), len(ops))
+
+    async def persist(self, ops, durability=None):
+        """Queue ``ops`` and wait for the requested durability level."""
+        with span("persist"):
+            item = self._item(ops, durability)
+            await self._enqueue(item)
+            if item[1] != "async":
+                await asyncio.wrap_future(item[2])
+
+    async def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure without blocking the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._queue.put, item)
+
+    async def put(self, collection, key, record, durability=None):
+        await self.persist([("put", collection, key, record)], durability)
+
+    async def delete(self, collection, key, durability=None):
+        await self.persist([("del", collection, key, None)], durability)
+
+    @property
+    def queued(self):
+        """Writes waiting for the writer thread."""
+        return self._queue.qsize()
+
+    async def drain(self):
+        """Wait until every write queued so far has reached the engine."""
+        with span("persist"):
+            item = self._item([], "async")
+            await self._enqueue(item)
+            await asyncio.wrap_future(item[2])
+
+    def _collect(self):
+        """Block for the next item, then gather a batch to commit together."""
+        item = self._queue.get()
+        batch = [item]
+        if item is None:
+            return batch
+        ops = item[3]
+        deadline = time.monotonic() + self.window
+        # fsync writes are not held back waiting for company
+        wait = item[1] != "fsync"
+        while ops < self.max_ops:
+            try:
+                timeout = deadline - time.monotonic()
+                if wait and timeout > 0:
+                    item = self._queue.get(timeout=timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+            ops += item[3]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            chunk, waiting = [], []
+            for item in batch:
+                if item is None:
+                    self._commit(chunk, waiting)
+                    return
+                payload, mode, future, _ = item
+                if mode != "fsync":
+                    chunk.append((payload, future))
+                    if mode == "group":
+                        waiting.append(future)
+                    continue
+                # Keep ordering: commit what came before, then this write alone
+                self._commit(chunk, waiting)
+                chunk, waiting = [], []
+                self._commit([(payload, future)], [future])
+            self._commit(chunk, waiting)
+
+    def _commit(self, chunk, waiting):
+        if not chunk:
+            return
+        futures = [future for _, future in chunk]
+        start = time.perf_counter()
+        try:
+            self.engine.write_many([payload for payload, _ in chunk])
+            if waiting:
+                self.engine.sync()
+        except Exception as e:
+            print(f"Error writing to {self.engine.name} storage: {e}")
+            for future in futures:
+                future.set_exception(e)
+            return
+        if self.on_commit is not None:
+            self.on_commit(time.perf_counter() - start)
+        for future in futures:
+            future.set_result(None)
+
+    def flush(self):
+        """Block until everything queued so far has been written and synced."""
+        if not self._closed:
+            self.submit([], durability="group").result()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.close()
+
+
+def create_storage(
+    data_dir, engine="journal", compact_every=1000, shared=False, columns=None
+):
+    """Build the storage engine named by ``engine`` for ``data_dir``.
+
+    ``columns`` (journal engine) maps collections to the indexed fields
+    its snapshots store as column tables.
+    """
+    if shared and (engine != "journal" or data_dir is None):
+        raise ValueError("Multi-worker mode requires the journal storage engine")
+    if engine == "sql":
+        # SQLAlchemy is only needed when the sql backend is selected
+        from app.core.database import get_engine
+        from app.core.repositories import SqlStorage
+
+        return SqlStorage(get_engine())
+    if data_dir is None:
+        return MemoryStorage()
+    if engine == "json":
+        return JsonFileStorage(data_dir)
+    if engine == "journal":
+        return JournalStorage(
+            data_dir, compact_every=compact_every, shared=shared, columns=columns
+        )
+    raise ValueError(f"Unknown storage engine: {engine}")
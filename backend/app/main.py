@@ -1,15 +1,46 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
+import atexit
+import csv
+import io
+import math
+from contextlib import asynccontextmanager, nullcontext
 import os
-import json
-from datetime import datetime, timedelta, timezone
+import zlib
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional, get_args
 import jwt
 
+from app.core.auth import TokenAuthenticator, TokenCache
+from app.core.changes import ChangeTracker
+from app.core.events import EventHub
+from app.core.indexes import CountIndex, IndexedCollection, SortedIndex, paginate
+from app.core.metrics import MetricsMiddleware, Registry
+from app.core.profiling import ProfilingMiddleware, span
+from app.core.models import Project, Task, User
+from app.core.search import SearchIndex
+from app.core.security import HasherBusy, PasswordHasher
+from app.core.serialization import FastJSONResponse, dumps
+from app.core.storage import StorageWriter, create_storage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Drain queued writes before the process exits
+    writer.close()
+    password_hasher.close()
+
+
 app = FastAPI(
     title="CampusConnect API",
     description="A simple working backend for university student collaboration",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware
@@ -19,17 +50,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Secret key for JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
-
-# File paths for persistence
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+# Password hashing: the work factor is calibrated at startup so one hash takes
+# about PASSWORD_HASH_TARGET_MS, unless PASSWORD_HASH_ITERATIONS pins it.
+# Hashes run on PASSWORD_HASH_WORKERS threads; logins and registrations beyond
+# PASSWORD_HASH_MAX_PENDING in flight are turned away with a 503.
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "50"))
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "0"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# Largest page the list endpoints return for one request
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+# Largest number of operations accepted by /api/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+# Deletes remembered for /api/sync; older sync tokens get a full resync
+SYNC_MAX_TOMBSTONES = int(os.getenv("SYNC_MAX_TOMBSTONES", "10000"))
+
+# Change feed: events buffered per stream before it is told to resync, and
+# seconds between keep-alive comments on an idle stream
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# Prometheus metrics at /metrics; each worker process reports its own
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Profiling (off by default): the fraction of requests that get phase timings
+# (Server-Timing) and a cProfile run; sampled requests slower than
+# PROFILE_THRESHOLD_MS are logged and the last PROFILE_KEEP are kept
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "200"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Emails of the operators allowed to read /api/debug/profiles, comma separated;
+# the reports hold every user's request paths
+PROFILE_ADMINS = {
+    email.strip()
+    for email in os.getenv("PROFILE_ADMINS", "").split(",")
+    if email.strip()
+}
+
+# Persistence settings
 DATA_DIR = os.getenv("TEST_DATA_DIR", "/tmp/data")  # Use /tmp which is always writable
-USERS_FILE = os.path.join(DATA_DIR, "users.json")
-PROJECTS_FILE = os.path.join(DATA_DIR, "projects.json")
-TASKS_FILE = os.path.join(DATA_DIR, "tasks.json")
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "journal")
+STORAGE_COMPACT_EVERY = int(os.getenv("STORAGE_COMPACT_EVERY", "1000"))
+STORAGE_DURABILITY = os.getenv("STORAGE_DURABILITY", "group")
+STORAGE_QUEUE_SIZE = int(os.getenv("STORAGE_QUEUE_SIZE", "10000"))
+STORAGE_COMMIT_WINDOW_MS = float(os.getenv("STORAGE_COMMIT_WINDOW_MS", "2"))
+STORAGE_COMMIT_MAX_OPS = int(os.getenv("STORAGE_COMMIT_MAX_OPS", "256"))
+# Uvicorn reads WEB_CONCURRENCY for its worker count; several workers share
+# the journal in DATA_DIR and must coordinate through it
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+STORAGE_MULTI_WORKER = os.getenv(
+    "STORAGE_MULTI_WORKER", "true" if WEB_CONCURRENCY > 1 else "false"
+).lower() in ("1", "true", "yes")
 
 # Create data directory if it doesn't exist
 try:
@@ -39,9 +118,6 @@ except Exception as e:
     print(f"⚠️ Warning: Could not create data directory {DATA_DIR}: {e}")
     # Fallback to current working directory
     DATA_DIR = os.path.join(os.getcwd(), "data")
-    USERS_FILE = os.path.join(DATA_DIR, "users.json")
-    PROJECTS_FILE = os.path.join(DATA_DIR, "projects.json")
-    TASKS_FILE = os.path.join(DATA_DIR, "tasks.json")
     try:
         os.makedirs(DATA_DIR, exist_ok=True)
         print(f"✅ Fallback data directory created: {DATA_DIR}")
@@ -49,60 +125,294 @@ except Exception as e:
         print(f"❌ Critical: Could not create fallback data directory: {e2}")
         # Use in-memory storage as last resort
         DATA_DIR = None
-        USERS_FILE = None
-        PROJECTS_FILE = None
-        TASKS_FILE = None
 
 
-# Helper functions for file persistence
-def load_data(file_path, default_value):
-    """Load data from JSON file"""
-    if file_path is None:
-        return default_value
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-    return default_value
-
-
-def save_data(file_path, data):
-    """Save data to JSON file"""
-    if file_path is None:
-        print("⚠️ Warning: File persistence disabled, data not saved")
-        return
-    try:
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2, default=str)
-    except Exception as e:
-        print(f"Error saving {file_path}: {e}")
+password_hasher = PasswordHasher(
+    iterations=PASSWORD_HASH_ITERATIONS or None,
+    target_ms=PASSWORD_HASH_TARGET_MS,
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+)
+password_hasher.dummy_hash()  # so the first unknown-email login is not slower
+print(f"🔑 Password hashing: {password_hasher.iterations} PBKDF2 iterations")
 
+PROJECT_INDEXES = ("owner_id", "status")
+TASK_INDEXES = ("assigned_to", "project_id", "status", "priority")
+# Stored as column tables in the snapshot, so the indexes (hash, sorted and
+# count) are built at startup without decoding records
+SNAPSHOT_COLUMNS = {"projects": PROJECT_INDEXES, "tasks": TASK_INDEXES + ("due_date",)}
 
 # Load existing data or initialize with defaults
 print("🔄 Loading data from files...")
-users_db = load_data(USERS_FILE, {})
-projects_db = load_data(PROJECTS_FILE, [])
-tasks_db = load_data(TASKS_FILE, [])
-print(
-    f"✅ Loaded {len(users_db)} users, {len(projects_db)} projects, {len(tasks_db)} tasks"
+storage = create_storage(
+    DATA_DIR,
+    engine=STORAGE_ENGINE,
+    compact_every=STORAGE_COMPACT_EVERY,
+    shared=STORAGE_MULTI_WORKER,
+    columns=SNAPSHOT_COLUMNS,
 )
+# Serializes writers across worker processes; a no-op with a single worker
+worker_lock = storage.worker_lock if STORAGE_MULTI_WORKER else nullcontext()
+
+with worker_lock:
+    state = storage.load()
+    # Loaded records may still be encoded; they are decoded on first access
+    users_db = IndexedCollection.from_mapping(
+        state["users"], primary_key="email", record_type=User
+    )
+    projects_db = IndexedCollection.from_mapping(
+        state["projects"],
+        indexes=PROJECT_INDEXES,
+        record_type=Project,
+        max_id=storage.max_ids.get("projects", 0),
+    )
+    tasks_db = IndexedCollection.from_mapping(
+        state["tasks"],
+        indexes=TASK_INDEXES,
+        record_type=Task,
+        max_id=storage.max_ids.get("tasks", 0),
+    )
+    collections = {"users": users_db, "projects": projects_db, "tasks": tasks_db}
+    storage.attach(lambda: {name: c.as_dict() for name, c in collections.items()})
+    print(
+        f"✅ Loaded {len(users_db)} users, {len(projects_db)} projects,"
+        f" {len(tasks_db)} tasks ({storage.name} storage)"
+    )
+
+    # Add a test user if it doesn't exist
+    if "test@example.com" not in users_db:
+        print("👤 Creating test user...")
+        test_user = users_db.insert(
+            User(
+                id=1,
+                username="testuser",
+                email="test@example.com",
+                password=password_hasher.hash("testpassword"),
+                full_name="Test User",
+                created_at=datetime.now(timezone.utc).isoformat(),
+            )
+        )
+        storage.put("users", "test@example.com", test_user)
+        print("✅ Test user created")
+
+# File I/O happens on the writer thread, off the event loop
+writer = StorageWriter(
+    storage,
+    durability=STORAGE_DURABILITY,
+    max_queue=STORAGE_QUEUE_SIZE,
+    window=STORAGE_COMMIT_WINDOW_MS / 1000,
+    max_ops=STORAGE_COMMIT_MAX_OPS,
+)
+atexit.register(writer.close)
 
-# Add a test user if it doesn't exist
-if "test@example.com" not in users_db:
-    print("👤 Creating test user...")
-    test_user = {
-        "id": 1,
-        "username": "testuser",
-        "email": "test@example.com",
-        "password": "testpassword",  # In production, hash this
-        "full_name": "Test User",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
-    users_db["test@example.com"] = test_user
-    save_data(USERS_FILE, users_db)
-    print("✅ Test user created")
+
+def parse_due_date(value):
+    """Return the calendar date of a task's ``due_date`` string, or ``None``."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def due_key(task):
+    """Sort key of open tasks with a due date: (assignee, due date, id)."""
+    if task.get("status") == "done" or not isinstance(task.get("assigned_to"), int):
+        return None
+    due = parse_due_date(task.get("due_date"))
+    return (task["assigned_to"], due, task["id"]) if due is not None else None
+
+
+def dated_key(task):
+    """Sort key of all tasks with a due date, done ones included."""
+    if not isinstance(task.get("assigned_to"), int):
+        return None
+    due = parse_due_date(task.get("due_date"))
+    return (task["assigned_to"], due, task["id"]) if due is not None else None
+
+
+# Open tasks ordered by deadline, for overdue and upcoming views
+DUE_KEY_FIELDS = ("assigned_to", "status", "due_date")
+due_index = SortedIndex(tasks_db, due_key, reads=DUE_KEY_FIELDS)
+# Every dated task, for due_before/due_after filters on the task list
+dated_index = SortedIndex(tasks_db, dated_key, reads=DUE_KEY_FIELDS)
+
+# Per-user counts behind the dashboard summary
+task_counts = CountIndex(
+    tasks_db,
+    lambda task: task.get("assigned_to"),
+    ("status", "priority"),
+    reads=("assigned_to",),
+)
+project_counts = CountIndex(
+    projects_db,
+    lambda project: project.get("owner_id"),
+    ("status",),
+    reads=("owner_id",),
+)
+
+search_index = SearchIndex()
+search_index.watch(users_db, "users", {"username": 2, "full_name": 2, "email": 1})
+search_index.watch(projects_db, "projects", {"title": 2, "description": 1})
+search_index.watch(tasks_db, "tasks", {"title": 2, "description": 1})
+
+# Versions behind ETags, and the change log behind /api/sync
+# Numbered by the storage's op count, so tokens and ETags hold across workers
+changes = ChangeTracker(
+    max_tombstones=SYNC_MAX_TOMBSTONES,
+    epoch=storage.epoch,
+    position=lambda: storage.sequence,
+)
+changes.watch(projects_db, "projects")
+changes.watch(tasks_db, "tasks")
+
+# Live change feed; subscribed after ``changes`` so event ids include the change
+event_hub = EventHub(queue_size=EVENTS_QUEUE_SIZE)
+event_hub.watch(projects_db, "projects", "owner_id", version=changes.token)
+event_hub.watch(tasks_db, "tasks", "assigned_to", version=changes.token)
+
+
+def apply_changes(ops):
+    """Apply storage ops written by other workers to the local collections."""
+    if not ops:
+        return
+    with changes.replaying():
+        for op, name, key, record in ops:
+            collection = collections[name]
+            if op == "put":
+                if key in collection:
+                    collection.update(key, record)
+                else:
+                    collection.insert(record)
+            elif key in collection:
+                collection.remove(key)
+    # A rebuild from the snapshot does not replay deleted records' ids
+    for name, max_id in storage.max_ids.items():
+        collections[name].reserve_ids(max_id)
+
+
+# Handlers that hash passwords take the worker lock themselves, only around
+# their mutation, so a slow hash does not hold up writes in every worker
+SELF_LOCKING_ROUTES = {"/api/auth/login", "/api/auth/register"}
+
+
+@asynccontextmanager
+async def exclusive_write():
+    """Run a mutation the way the middleware runs non-GET requests."""
+    if not STORAGE_MULTI_WORKER:
+        yield
+        return
+    async with worker_lock:
+        apply_changes(storage.read_changes())
+        yield
+        await writer.drain()
+
+
+if STORAGE_MULTI_WORKER:
+
+    @app.middleware("http")
+    async def sync_with_other_workers(request: Request, call_next):
+        if (
+            request.method in ("GET", "HEAD", "OPTIONS")
+            or request.url.path in SELF_LOCKING_ROUTES
+        ):
+            apply_changes(storage.read_changes())
+            return await call_next(request)
+        # Mutations run one at a time across workers, on up-to-date data,
+        # and their writes reach the journal before the lock is released
+        async with worker_lock:
+            apply_changes(storage.read_changes())
+            response = await call_next(request)
+            await writer.drain()
+        return response
+
+
+authenticate = TokenAuthenticator(
+    SECRET_KEY,
+    ALGORITHM,
+    users_db.get,
+    cache=TokenCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL),
+)
+
+profile_reports = deque(maxlen=PROFILE_KEEP)
+if PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        threshold=PROFILE_THRESHOLD_MS / 1000,
+        reports=profile_reports,
+    )
+    print(f"🔬 Profiling {PROFILE_SAMPLE_RATE:.0%} of requests")
+
+metrics = Registry()
+if METRICS_ENABLED:
+    # Added last so it is the outermost middleware and times everything
+    app.add_middleware(
+        MetricsMiddleware,
+        requests=metrics.counter(
+            "http_requests_total",
+            "HTTP requests by method, route and status.",
+            ("method", "route", "status"),
+        ),
+        latency=metrics.histogram(
+            "http_request_duration_seconds",
+            "Time from receiving a request to starting its response.",
+            ("method", "route"),
+        ),
+        in_flight=metrics.gauge(
+            "http_requests_in_progress", "Requests being handled, streams included."
+        ),
+    )
+    writer.on_commit = metrics.histogram(
+        "storage_write_duration_seconds",
+        f"Time to write (and sync) one commit to {storage.name} storage.",
+    ).observe
+    metrics.counter(
+        "storage_written_bytes_total",
+        "Bytes written to storage files, snapshots included.",
+        collect=lambda: storage.bytes_written,
+    )
+    metrics.counter(
+        "storage_commits_total",
+        "Commits made by the storage writer.",
+        collect=lambda: writer.batches,
+    )
+    metrics.gauge(
+        "storage_queued_writes",
+        "Writes waiting for the storage writer.",
+        collect=lambda: writer.queued,
+    )
+    metrics.gauge(
+        "collection_records",
+        "Records held in memory per collection.",
+        ("collection",),
+        collect=lambda: {(name,): len(c) for name, c in collections.items()},
+    )
+    metrics.gauge(
+        "search_index_size",
+        "Search index sizes; unsearched collections are not indexed yet.",
+        ("stat",),
+        collect=lambda: {(k,): v for k, v in search_index.stats().items()},
+    )
+    metrics.gauge(
+        "auth_cache_entries",
+        "Tokens in the authentication cache.",
+        collect=lambda: len(authenticate.cache),
+    )
+    metrics.gauge(
+        "password_hash_pending",
+        "Password hashes queued or running.",
+        collect=lambda: password_hasher.pending,
+    )
+    metrics.counter(
+        "password_hash_rejected_total",
+        "Logins and registrations turned away because hashing was saturated.",
+        collect=lambda: password_hasher.rejected,
+    )
+    metrics.gauge(
+        "event_streams", "Open change feed streams.", collect=lambda: len(event_hub)
+    )
 
 print("🚀 Backend startup complete!")
 
@@ -123,6 +433,72 @@ class UserLogin(BaseModel):
     password: str
 
 
+TaskStatus = Literal["todo", "in_progress", "review", "done"]
+TaskPriority = Literal["low", "medium", "high"]
+
+
+class ProjectCreate(BaseModel):
+    title: str = Field("Untitled Project", min_length=1, max_length=200)
+    description: str = Field("", max_length=5000)
+    status: str = Field("active", min_length=1, max_length=32)
+
+
+class ProjectUpdate(BaseModel):
+    title: str = Field(None, min_length=1, max_length=200)
+    description: str = Field(None, max_length=5000)
+    status: str = Field(None, min_length=1, max_length=32)
+
+
+def check_due_date(value):
+    """Accept ISO dates or datetimes; blank form values mean no due date.
+
+    The whole string must parse, not just the date prefix the indexes use.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("due_date must be an ISO 8601 date") from None
+    if parse_due_date(value) is None:
+        raise ValueError("due_date must be an ISO 8601 date")
+    return value
+
+
+class TaskCreate(BaseModel):
+    title: str = Field("Untitled Task", min_length=1, max_length=200)
+    description: str = Field("", max_length=5000)
+    project_id: Optional[int] = None
+    status: TaskStatus = "todo"
+    priority: TaskPriority = "medium"
+    due_date: Optional[str] = None
+
+    _check_due_date = field_validator("due_date")(check_due_date)
+
+
+class TaskUpdate(BaseModel):
+    title: str = Field(None, min_length=1, max_length=200)
+    description: str = Field(None, max_length=5000)
+    status: TaskStatus = None
+    priority: TaskPriority = None
+    due_date: Optional[str] = None
+
+    _check_due_date = field_validator("due_date")(check_due_date)
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    type: Literal["project", "task"]
+    id: Optional[int] = None
+    data: dict = {}
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+
 # Helper functions
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -132,9 +508,16 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def verify_password(plain_password, hashed_password):
-    # Simple password verification (in production, use proper hashing)
-    return plain_password == hashed_password
+async def run_hasher(operation, *args):
+    try:
+        with span("password_hash"):
+            return await operation(*args)
+    except HasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
 
 
 # Basic endpoints
@@ -159,17 +542,22 @@ async def register(user: UserRegister):
     if user.email in users_db:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Create user (in production, hash the password)
-    user_data = {
-        "id": len(users_db) + 1,
-        "username": user.username,
-        "email": user.email,
-        "password": user.password,  # In production, hash this
-        "full_name": user.full_name,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
-    users_db[user.email] = user_data
-    save_data(USERS_FILE, users_db)
+    password = await run_hasher(password_hasher.hash_async, user.password)
+    async with exclusive_write():
+        # Checked again: the email may have been taken while hashing
+        if user.email in users_db:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        user_data = users_db.insert(
+            User(
+                id=len(users_db) + 1,
+                username=user.username,
+                email=user.email,
+                password=password,
+                full_name=user.full_name,
+                created_at=datetime.now(timezone.utc).isoformat(),
+            )
+        )
+        await writer.put("users", user.email, user_data)
 
     return {
         "status": "success",
@@ -186,8 +574,28 @@ async def register(user: UserRegister):
 @app.post("/api/auth/login")
 async def login(user: UserLogin):
     stored_user = users_db.get(user.email)
-    if not stored_user or not verify_password(user.password, stored_user["password"]):
+    # Unknown emails still pay for a hash, or response times would tell
+    # which addresses are registered
+    stored_password = stored_user["password"] if stored_user else None
+    matches, needs_rehash = await run_hasher(
+        password_hasher.verify_async, user.password, stored_password
+    )
+    if not matches:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if needs_rehash:
+        # Stored with older parameters (or in plaintext): upgrade it now that
+        # the password is known. Skipped if the hasher is saturated.
+        try:
+            password = await password_hasher.hash_async(user.password)
+        except HasherBusy:
+            password = None
+        if password:
+            async with exclusive_write():
+                current = users_db.get(user.email)
+                # Leave it alone if the password changed in the meantime
+                if current and current["password"] == stored_password:
+                    updated = users_db.update(user.email, {"password": password})
+                    await writer.put("users", user.email, updated)
 
     access_token = create_access_token(data={"sub": user.email})
 
@@ -206,33 +614,13 @@ async def login(user: UserLogin):
 
 
 @app.get("/api/auth/me")
-async def get_current_user_info(request: Request):
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    token = auth_header.split(" ")[1]
-
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        stored_user = users_db[user_email]
-        return {
-            "id": stored_user["id"],
-            "username": stored_user["username"],
-            "email": stored_user["email"],
-            "full_name": stored_user["full_name"],
-        }
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def get_current_user_info(current_user: dict = Depends(authenticate)):
+    return {
+        "id": current_user["id"],
+        "username": current_user["username"],
+        "email": current_user["email"],
+        "full_name": current_user["full_name"],
+    }
 
 
 # User endpoints
@@ -246,7 +634,7 @@ async def get_users():
                 "email": user["email"],
                 "full_name": user["full_name"],
             }
-            for user in users_db.values()
+            for user in users_db
         ]
     }
 
@@ -257,331 +645,641 @@ async def get_current_user():
     return {"message": "Current user info", "users_count": len(users_db)}
 
 
-# Project endpoints
-@app.get("/api/projects")
-async def get_projects(request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+def get_owned_project(project_id: int, current_user: dict):
+    project = projects_db.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        current_user = users_db[user_email]
-        user_projects = [
-            p for p in projects_db if p.get("owner_id") == current_user["id"]
-        ]
-        return {"projects": user_projects}
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    # Check if user owns the project
+    if project.get("owner_id") != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return project
 
 
-@app.get("/api/projects/{project_id}")
-async def get_project(project_id: int, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+def get_assigned_task(task_id: int, current_user: dict):
+    task = tasks_db.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
+    # Check if user is assigned to the task
+    if task.get("assigned_to") != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return task
 
-        current_user = users_db[user_email]
 
-        # Find the project
-        project = next((p for p in projects_db if p["id"] == project_id), None)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return "*" in candidates or etag.removeprefix("W/") in [
+        tag.removeprefix("W/") for tag in candidates
+    ]
 
-        # Check if user owns the project
-        if project.get("owner_id") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
 
-        return project
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+def list_etag(name: str, request: Request, current_user: dict):
+    """Validator for a list: collection version plus the user and query."""
+    query = f"{current_user['id']}:{request.url.path}?{request.url.query}"
+    digest = zlib.crc32(query.encode("utf-8"))
+    version = changes.collection_version(name)
+    return f'W/"{name}-{changes.epoch}-{version}-{digest:08x}"'
 
 
-@app.post("/api/projects")
-async def create_project(project_data: dict, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+def record_etag(name: str, key: int):
+    version = changes.record_version(name, key)
+    return f'W/"{name}-{changes.epoch}-{key}-{version}"'
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        current_user = users_db[user_email]
-
-        project = {
-            "id": len(projects_db) + 1,
-            "title": project_data.get("title", "Untitled Project"),
-            "description": project_data.get("description", ""),
-            "status": project_data.get("status", "active"),
-            "owner_id": current_user["id"],
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
-        projects_db.append(project)
-        save_data(PROJECTS_FILE, projects_db)
-        return project
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
+def not_modified(request: Request, response: Response, etag: str):
+    """Return a 304 if the client holds ``etag``; otherwise tag ``response``.
 
-@app.put("/api/projects/{project_id}")
-async def update_project(project_id: int, project_data: dict, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+    Called before the body is built, so a match skips the lookup and the
+    serialization entirely.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
 
-        current_user = users_db[user_email]
+def json_response(content, response: Optional[Response] = None):
+    """Encode ``content`` directly, skipping FastAPI's ``jsonable_encoder``.
 
-        # Find the project
-        project = next((p for p in projects_db if p["id"] == project_id), None)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+    For large lists of stored records, which are already JSON-ready. Headers
+    set on the injected ``response`` (e.g. the ETag) are carried over.
+    """
+    headers = response.headers if response is not None else None
+    return FastJSONResponse(content, headers=headers)
 
-        # Check if user owns the project
-        if project.get("owner_id") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
 
-        # Update the project
-        project.update(
-            {
-                "title": project_data.get("title", project["title"]),
-                "description": project_data.get("description", project["description"]),
-                "status": project_data.get("status", project["status"]),
-            }
-        )
-        save_data(PROJECTS_FILE, projects_db)
+def new_project(project_data: ProjectCreate, current_user: dict):
+    return Project(
+        id=projects_db.next_id(),
+        owner_id=current_user["id"],
+        created_at=datetime.now(timezone.utc).isoformat(),
+        **project_data.model_dump(),
+    )
 
-        return project
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
+def remove_project(project_id: int):
+    """Remove a project and its tasks; return the storage ops to persist."""
+    projects_db.remove(project_id)
+    ops = [("del", "projects", project_id, None)]
+    for task in tasks_db.find("project_id", project_id):
+        tasks_db.remove(task["id"])
+        ops.append(("del", "tasks", task["id"], None))
+    return ops
 
-@app.delete("/api/projects/{project_id}")
-async def delete_project(project_id: int, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
+def new_task(task_data: TaskCreate, current_user: dict):
+    return Task(
+        id=tasks_db.next_id(),
+        assigned_to=current_user["id"],
+        created_at=datetime.now(timezone.utc).isoformat(),
+        **task_data.model_dump(),
+    )
 
-        current_user = users_db[user_email]
 
-        # Find the project
-        project = next((p for p in projects_db if p["id"] == project_id), None)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+def changes_of(update: BaseModel):
+    """The fields a PUT body actually set; omitted fields keep their value."""
+    return update.model_dump(exclude_unset=True)
 
-        # Check if user owns the project
-        if project.get("owner_id") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
 
-        # Remove the project
-        projects_db.remove(project)
-        save_data(PROJECTS_FILE, projects_db)
+# Project endpoints
+@app.get("/api/projects")
+async def get_projects(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    current_user: dict = Depends(authenticate),
+):
+    etag = list_etag("projects", request, current_user)
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
+    criteria = {"owner_id": current_user["id"]}
+    if status is not None:
+        criteria["status"] = status
+    user_projects, next_cursor = paginate(projects_db.where(**criteria), limit, cursor)
+    return json_response(
+        {"projects": user_projects, "next_cursor": next_cursor}, response
+    )
 
-        # Also remove associated tasks
-        tasks_to_remove = [t for t in tasks_db if t.get("project_id") == project_id]
-        for task in tasks_to_remove:
-            tasks_db.remove(task)
-        save_data(TASKS_FILE, tasks_db)
 
-        return {"message": "Project deleted successfully"}
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.get("/api/projects/{project_id}")
+async def get_project(
+    project_id: int,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(authenticate),
+):
+    project = get_owned_project(project_id, current_user)
+    etag = record_etag("projects", project_id)
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
+    return project
 
 
-# Task endpoints
-@app.get("/api/tasks")
-async def get_tasks(request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.post("/api/projects")
+async def create_project(
+    project_data: ProjectCreate, current_user: dict = Depends(authenticate)
+):
+    project = projects_db.insert(new_project(project_data, current_user))
+    await writer.put("projects", project["id"], project)
+    return project
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
 
-        current_user = users_db[user_email]
-        user_tasks = [t for t in tasks_db if t.get("assigned_to") == current_user["id"]]
-        return {"tasks": user_tasks}
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.put("/api/projects/{project_id}")
+async def update_project(
+    project_id: int,
+    project_data: ProjectUpdate,
+    current_user: dict = Depends(authenticate),
+):
+    project = get_owned_project(project_id, current_user)
 
+    # Update the project
+    project = projects_db.update(project_id, changes_of(project_data))
+    await writer.put("projects", project_id, project)
 
-@app.get("/api/tasks/{task_id}")
-async def get_task(task_id: int, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return project
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
 
-        current_user = users_db[user_email]
+@app.delete("/api/projects/{project_id}")
+async def delete_project(project_id: int, current_user: dict = Depends(authenticate)):
+    get_owned_project(project_id, current_user)
 
-        # Find the task
-        task = next((t for t in tasks_db if t["id"] == task_id), None)
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
+    # Remove the project and its tasks as one batch
+    await writer.persist(remove_project(project_id))
 
-        # Check if user is assigned to the task
-        if task.get("assigned_to") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
+    return {"message": "Project deleted successfully"}
 
-        return task
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
+# Task endpoints
+@app.get("/api/tasks")
+async def get_tasks(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    project_id: Optional[int] = None,
+    due_before: Optional[date] = Query(None, description="Due on or before"),
+    due_after: Optional[date] = Query(None, description="Due on or after"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    current_user: dict = Depends(authenticate),
+):
+    etag = list_etag("tasks", request, current_user)
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
+    uid = current_user["id"]
+    criteria = {}
+    for field, value in (
+        ("status", status),
+        ("priority", priority),
+        ("project_id", project_id),
+    ):
+        if value is not None:
+            criteria[field] = value
+    if due_before is not None or due_after is not None:
+        # Bisect the user's dated tasks, then check the other filters on
+        # that range only
+        lo = (uid, due_after or date.min)
+        hi = (uid, due_before or date.max, math.inf)
+        user_tasks = [
+            task
+            for task in dated_index.range(lo, hi)
+            if all(task.get(field) == value for field, value in criteria.items())
+        ]
+    else:
+        user_tasks = tasks_db.where(assigned_to=uid, **criteria)
+    user_tasks, next_cursor = paginate(user_tasks, limit, cursor)
+    return json_response({"tasks": user_tasks, "next_cursor": next_cursor}, response)
+
+
+@app.get("/api/tasks/due")
+async def get_due_tasks(
+    days: int = Query(7, ge=0, le=366),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(authenticate),
+):
+    """Open tasks past their due date, and those due within ``days``."""
+    uid = current_user["id"]
+    today = datetime.now(timezone.utc).date()
+    horizon = today + timedelta(days=days + 1)
+    return {
+        "today": today.isoformat(),
+        "overdue": due_index.range((uid, date.min), (uid, today), limit),
+        "upcoming": due_index.range((uid, today), (uid, horizon), limit),
+    }
 
-@app.post("/api/tasks")
-async def create_task(task_data: dict, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        current_user = users_db[user_email]
-
-        task = {
-            "id": len(tasks_db) + 1,
-            "title": task_data.get("title", "Untitled Task"),
-            "description": task_data.get("description", ""),
-            "project_id": task_data.get("project_id"),
-            "assigned_to": current_user["id"],
-            "status": task_data.get("status", "todo"),
-            "priority": task_data.get("priority", "medium"),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "due_date": task_data.get("due_date"),
-        }
-        tasks_db.append(task)
-        save_data(TASKS_FILE, tasks_db)
-        return task
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.get("/api/tasks/project/{project_id}")
+async def get_project_tasks(
+    project_id: int,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    current_user: dict = Depends(authenticate),
+):
+    get_owned_project(project_id, current_user)
+    etag = list_etag("tasks", request, current_user)
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
+    # Only the caller's own tasks: anyone can create a task naming the project
+    project_tasks, next_cursor = paginate(
+        tasks_db.where(project_id=project_id, assigned_to=current_user["id"]),
+        limit,
+        cursor,
+    )
+    return json_response({"tasks": project_tasks, "next_cursor": next_cursor}, response)
 
 
-@app.put("/api/tasks/{task_id}")
-async def update_task(task_id: int, task_data: dict, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.get("/api/tasks/{task_id}")
+async def get_task(
+    task_id: int,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(authenticate),
+):
+    task = get_assigned_task(task_id, current_user)
+    etag = record_etag("tasks", task_id)
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
+    return task
 
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
 
-        current_user = users_db[user_email]
+@app.post("/api/tasks")
+async def create_task(
+    task_data: TaskCreate, current_user: dict = Depends(authenticate)
+):
+    task = tasks_db.insert(new_task(task_data, current_user))
+    await writer.put("tasks", task["id"], task)
+    return task
 
-        # Find the task
-        task = next((t for t in tasks_db if t["id"] == task_id), None)
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
 
-        # Check if user is assigned to the task
-        if task.get("assigned_to") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
+@app.put("/api/tasks/{task_id}")
+async def update_task(
+    task_id: int, task_data: TaskUpdate, current_user: dict = Depends(authenticate)
+):
+    task = get_assigned_task(task_id, current_user)
 
-        # Update the task
-        task.update(
-            {
-                "title": task_data.get("title", task["title"]),
-                "description": task_data.get("description", task["description"]),
-                "status": task_data.get("status", task["status"]),
-                "priority": task_data.get("priority", task["priority"]),
-                "due_date": task_data.get("due_date", task["due_date"]),
-            }
-        )
-        save_data(TASKS_FILE, tasks_db)
+    # Update the task
+    task = tasks_db.update(task_id, changes_of(task_data))
+    await writer.put("tasks", task_id, task)
 
-        return task
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return task
 
 
 @app.delete("/api/tasks/{task_id}")
-async def delete_task(task_id: int, request: Request):
-    # Get the current user from JWT token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if not user_email or user_email not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
+async def delete_task(task_id: int, current_user: dict = Depends(authenticate)):
+    get_assigned_task(task_id, current_user)
+
+    # Remove the task
+    tasks_db.remove(task_id)
+    await writer.delete("tasks", task_id)
+
+    return {"message": "Task deleted successfully"}
+
+
+# Delta sync endpoint
+SYNC_OWNER_FIELDS = {"projects": "owner_id", "tasks": "assigned_to"}
+
+
+@app.get("/api/sync")
+async def sync(
+    since: Optional[str] = Query(None, description="Token from the last sync"),
+    current_user: dict = Depends(authenticate),
+):
+    """Projects and tasks changed since ``since``, with deletes as ids.
+
+    Without a usable token the response has ``reset: true`` and carries the
+    user's full lists; the client replaces its state with them either way
+    and keeps the returned ``version`` for the next call.
+    """
+    uid = current_user["id"]
+    result = {
+        "version": changes.token(),
+        "reset": False,
+        "projects": [],
+        "tasks": [],
+        "deleted": {"projects": [], "tasks": []},
+    }
+    entries = changes.changes_since(since)
+    if entries is None:
+        result["reset"] = True
+        result["projects"] = projects_db.find("owner_id", uid)
+        result["tasks"] = tasks_db.find("assigned_to", uid)
+        return json_response(result)
+    for name, record, deleted in entries:
+        if record.get(SYNC_OWNER_FIELDS[name]) != uid:
+            continue
+        if deleted:
+            result["deleted"][name].append(record["id"])
+        else:
+            result[name].append(record)
+    return json_response(result)
+
+
+# Change feed endpoint
+@app.get("/api/events")
+async def events(
+    request: Request, current_user: dict = Depends(authenticate.header_or_query)
+):
+    """Server-Sent Events stream of the user's project and task changes.
+
+    Each ``change`` event carries the sync token as its id. A ``resync``
+    event means the stream fell behind and events were dropped; the client
+    should catch up through ``/api/sync``.
+    """
+    subscription = event_hub.subscribe(current_user["id"])
+    # Other workers' writes only reach this process when it reads the journal
+    tick = min(EVENTS_HEARTBEAT, 1.0) if STORAGE_MULTI_WORKER else EVENTS_HEARTBEAT
+
+    async def stream():
+        try:
+            yield f"retry: 3000\nid: {changes.token()}\nevent: ready\ndata: {{}}\n\n"
+            idle = 0.0
+            while True:
+                message = await subscription.get(timeout=tick)
+                if message is not None:
+                    idle = 0.0
+                    yield message
+                    continue
+                if await request.is_disconnected():
+                    break
+                if STORAGE_MULTI_WORKER:
+                    apply_changes(storage.read_changes())
+                idle += tick
+                if idle >= EVENTS_HEARTBEAT:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Export endpoint
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_SOURCES = (
+    ("projects", "project", "owner_id"),
+    ("tasks", "task", "assigned_to"),
+)
+EXPORT_COLUMNS = ["type"] + list(dict.fromkeys(Project._fields + Task._fields))
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_export_cursor(cursor: Optional[str]):
+    """``"<type>:<id>"`` of the last record received, or ``None`` to start over."""
+    if cursor is None:
+        return None
+    kind, _, record_id = cursor.partition(":")
+    if kind not in ("project", "task") or not record_id.isdigit():
+        raise HTTPException(status_code=422, detail="cursor must be <type>:<id>")
+    return kind, int(record_id)
+
+
+def export_records(uid: int, cursor):
+    """Yield ``(type, record)`` for the user's projects, then tasks, by id.
+
+    Only the ids are collected up front; each record is fetched when it is
+    written, so records changed or deleted meanwhile are exported as they
+    are then (or skipped).
+    """
+    for name, kind, owner_field in EXPORT_SOURCES:
+        collection = projects_db if name == "projects" else tasks_db
+        if cursor is not None and kind == "project" and cursor[0] == "task":
+            continue
+        after = cursor[1] if cursor is not None and cursor[0] == kind else 0
+        ids = sorted(
+            record["id"]
+            for record in collection.find(owner_field, uid)
+            if record["id"] > after
+        )
+        for record_id in ids:
+            record = collection.get(record_id)
+            if record is not None:
+                yield kind, record
+
+
+def encode_ndjson(kind: str, record):
+    return dumps({"type": kind, "record": record}) + b"\n"
+
+
+def csv_encoder():
+    """Return ``encode(kind, record)`` producing one CSV row as bytes."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_COLUMNS, extrasaction="ignore")
+
+    def encode(kind, record):
+        writer.writerow({"type": kind, **record})
+        row = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return row.encode("utf-8")
+
+    return encode
+
+
+@app.get("/api/export")
+async def export(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = Query(None, description="<type>:<id> to resume after"),
+    current_user: dict = Depends(authenticate),
+):
+    """Stream the user's projects and tasks as NDJSON or CSV.
+
+    Output is produced in chunks while the client reads it, so memory does
+    not grow with the number of records. An interrupted download resumes
+    with ``cursor`` set to the type and id of the last record received.
+    """
+    position = parse_export_cursor(cursor)
+    uid = current_user["id"]
+
+    async def stream():
+        encode = encode_ndjson if format == "ndjson" else csv_encoder()
+        chunk = []
+        size = 0
+        if format == "csv" and position is None:
+            chunk.append((",".join(EXPORT_COLUMNS) + "\r\n").encode("utf-8"))
+        for kind, record in export_records(uid, position):
+            line = encode(kind, record)
+            chunk.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_SIZE:
+                yield b"".join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield b"".join(chunk)
+
+    filename = f"campusconnect-export.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Batch endpoint
+BATCH_BODIES = {
+    ("project", "create"): ProjectCreate,
+    ("project", "update"): ProjectUpdate,
+    ("task", "create"): TaskCreate,
+    ("task", "update"): TaskUpdate,
+}
+
+
+def check_batch_operation(operation: BatchOperation, current_user: dict, removed: set):
+    """Validate an operation and return its parsed body (``None`` for deletes).
+
+    Raises the HTTPException the single-item endpoint would raise.
+    ``removed`` holds ``(type, id)`` pairs deleted by earlier operations of
+    the same batch, including tasks cascaded from a project delete.
+    """
+    body = None
+    body_model = BATCH_BODIES.get((operation.type, operation.op))
+    if body_model is not None:
+        try:
+            body = body_model.model_validate(operation.data)
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False))
+    if operation.op == "create":
+        return body
+    if operation.id is None:
+        raise HTTPException(status_code=422, detail="id is required")
+    if (operation.type, operation.id) in removed:
+        raise HTTPException(
+            status_code=404, detail=f"{operation.type.capitalize()} not found"
+        )
+    if operation.type == "project":
+        get_owned_project(operation.id, current_user)
+        if operation.op == "delete":
+            removed.add(("project", operation.id))
+            removed.update(
+                ("task", task["id"])
+                for task in tasks_db.find("project_id", operation.id)
+            )
+    else:
+        get_assigned_task(operation.id, current_user)
+        if operation.op == "delete":
+            removed.add(("task", operation.id))
+    return body
+
+
+def apply_batch_operation(
+    operation: BatchOperation, body, current_user: dict, ops: list
+):
+    """Apply a checked operation, append its storage ops and return its result."""
+    result = {"op": operation.op, "type": operation.type}
+    if operation.type == "project":
+        if operation.op == "create":
+            record = projects_db.insert(new_project(body, current_user))
+        elif operation.op == "update":
+            record = projects_db.update(operation.id, changes_of(body))
+        else:
+            ops.extend(remove_project(operation.id))
+            return {**result, "id": operation.id}
+        ops.append(("put", "projects", record["id"], record))
+    else:
+        if operation.op == "create":
+            record = tasks_db.insert(new_task(body, current_user))
+        elif operation.op == "update":
+            record = tasks_db.update(operation.id, changes_of(body))
+        else:
+            tasks_db.remove(operation.id)
+            ops.append(("del", "tasks", operation.id, None))
+            return {**result, "id": operation.id}
+        ops.append(("put", "tasks", record["id"], record))
+    return {**result, "id": record["id"], "record": record}
+
+
+@app.post("/api/batch")
+async def batch(request: BatchRequest, current_user: dict = Depends(authenticate)):
+    """Apply an ordered list of project/task operations all-or-nothing.
+
+    Every operation is checked before any is applied; if one fails, none
+    are applied and the per-item errors are returned with status 400. The
+    applied operations are persisted together as a single write.
+    """
+    removed = set()
+    errors = []
+    bodies = []
+    for index, operation in enumerate(request.operations):
+        try:
+            bodies.append(check_batch_operation(operation, current_user, removed))
+        except HTTPException as exc:
+            errors.append(
+                {"index": index, "status_code": exc.status_code, "detail": exc.detail}
+            )
+    if errors:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "No operations were applied", "errors": errors},
+        )
 
-        current_user = users_db[user_email]
+    ops = []
+    results = [
+        {"index": index, **apply_batch_operation(operation, body, current_user, ops)}
+        for index, (operation, body) in enumerate(zip(request.operations, bodies))
+    ]
+    await writer.persist(ops)
+    return {"results": results}
+
+
+# Dashboard
+@app.get("/api/dashboard/summary")
+async def get_dashboard_summary(current_user: dict = Depends(authenticate)):
+    """Project and task counts for the dashboard, without listing records."""
+    uid = current_user["id"]
+    today = datetime.now(timezone.utc).date()
+    tasks = task_counts.counts(uid)
+    tasks["status"] = {
+        **dict.fromkeys(get_args(TaskStatus), 0),
+        **tasks["status"],
+    }
+    tasks["priority"] = {
+        **dict.fromkeys(get_args(TaskPriority), 0),
+        **tasks["priority"],
+    }
+    tasks["open"] = tasks["total"] - tasks["status"]["done"]
+    tasks["overdue"] = due_index.count((uid, date.min), (uid, today))
+    tasks["due_today"] = due_index.count((uid, today), (uid, today + timedelta(1)))
+    return {
+        "today": today.isoformat(),
+        "projects": project_counts.counts(uid),
+        "tasks": tasks,
+    }
 
-        # Find the task
-        task = next((t for t in tasks_db if t["id"] == task_id), None)
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
 
-        # Check if user is assigned to the task
-        if task.get("assigned_to") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
+@app.get("/api/debug/profiles")
+async def get_profiles(current_user: dict = Depends(authenticate)):
+    """Slow sampled requests, newest first, for the ``PROFILE_ADMINS``."""
+    if PROFILE_SAMPLE_RATE <= 0:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if current_user["email"] not in PROFILE_ADMINS:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "threshold_ms": PROFILE_THRESHOLD_MS,
+        "profiles": list(reversed(profile_reports)),
+    }
 
-        # Remove the task
-        tasks_db.remove(task)
-        save_data(TASKS_FILE, tasks_db)
 
-        return {"message": "Task deleted successfully"}
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 # Environment info
@@ -595,65 +1293,55 @@ async def get_info():
         "users_count": len(users_db),
         "projects_count": len(projects_db),
         "tasks_count": len(tasks_db),
+        "auth_cache": authenticate.cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "event_streams": len(event_hub),
     }
 
 
 # Global search endpoint
 @app.get("/api/search/global")
-async def global_search(q: str):
+async def global_search(q: str, limit: int = Query(20, ge=1, le=100)):
     if not q or len(q.strip()) < 2:
         return {"projects": [], "tasks": [], "users": []}
 
-    query = q.lower().strip()
+    hits = search_index.search(q, ("projects", "tasks", "users"), limit=limit)
     results = {"projects": [], "tasks": [], "users": []}
 
-    # Search in projects
-    for project in projects_db:
-        if (
-            query in project.get("title", "").lower()
-            or query in project.get("description", "").lower()
-        ):
-            results["projects"].append(
-                {
-                    "id": project["id"],
-                    "title": project["title"],
-                    "description": project.get("description", ""),
-                    "status": project.get("status", ""),
-                    "created_at": project.get("created_at", ""),
-                }
-            )
+    for _, project_id in hits["projects"]:
+        project = projects_db[project_id]
+        results["projects"].append(
+            {
+                "id": project["id"],
+                "title": project["title"],
+                "description": project.get("description", ""),
+                "status": project.get("status", ""),
+                "created_at": project.get("created_at", ""),
+            }
+        )
 
-    # Search in tasks
-    for task in tasks_db:
-        if (
-            query in task.get("title", "").lower()
-            or query in task.get("description", "").lower()
-        ):
-            results["tasks"].append(
-                {
-                    "id": task["id"],
-                    "title": task["title"],
-                    "description": task.get("description", ""),
-                    "status": task.get("status", ""),
-                    "project_id": task.get("project_id"),
-                    "created_at": task.get("created_at", ""),
-                }
-            )
+    for _, task_id in hits["tasks"]:
+        task = tasks_db[task_id]
+        results["tasks"].append(
+            {
+                "id": task["id"],
+                "title": task["title"],
+                "description": task.get("description", ""),
+                "status": task.get("status", ""),
+                "project_id": task.get("project_id"),
+                "created_at": task.get("created_at", ""),
+            }
+        )
 
-    # Search in users
-    for user in users_db.values():
-        if (
-            query in user.get("username", "").lower()
-            or query in user.get("full_name", "").lower()
-            or query in user.get("email", "").lower()
-        ):
-            results["users"].append(
-                {
-                    "id": user["id"],
-                    "username": user["username"],
-                    "full_name": user["full_name"],
-                    "email": user["email"],
-                }
-            )
+    for _, email in hits["users"]:
+        user = users_db[email]
+        results["users"].append(
+            {
+                "id": user["id"],
+                "username": user["username"],
+                "full_name": user["full_name"],
+                "email": user["email"],
+            }
+        )
 
     return results
@@ -0,0 +1,49 @@
+"""Compare the memory held by task records stored as dicts and as ``Task``.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_records --tasks 100000
+"""
+
+import argparse
+import tracemalloc
+
+from app.core.indexes import IndexedCollection
+from app.core.models import Task
+from benchmarks.bench_serialization import make_tasks
+
+
+def measure(build):
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = make_tasks(args.tasks)
+    indexes = ("assigned_to", "project_id", "status", "priority")
+    cases = [
+        ("dict records", lambda: IndexedCollection(map(dict, rows), indexes=indexes)),
+        (
+            "Task records",
+            lambda: IndexedCollection(rows, indexes=indexes, record_type=Task),
+        ),
+    ]
+    print(f"{args.tasks} tasks in an IndexedCollection (field values shared)")
+    for name, build in cases:
+        total = measure(build)
+        print(
+            f"  {name:<14} {total / 2**20:8.1f} MiB"
+            f"  {total / args.tasks:6.0f} bytes/record"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare JSON encoding paths on a large task list.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_serialization --tasks 10000
+
+Times the previous response path (``jsonable_encoder`` + stdlib ``json``),
+the direct ``app.core.serialization.dumps`` path, and the legacy pretty
+printed file dump against the compact one.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.serialization import BACKEND, dumps
+
+
+def make_tasks(count):
+    created = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": i,
+            "title": f"Task {i}",
+            "description": "Write the report and share it with the group " * 2,
+            "project_id": i % 50,
+            "assigned_to": i % 200,
+            "status": ("todo", "in_progress", "review", "done")[i % 4],
+            "priority": ("low", "medium", "high")[i % 3],
+            "created_at": created,
+            "due_date": "2026-05-01",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = {"tasks": make_tasks(args.tasks), "next_cursor": None}
+    # (name, encoder, is this the baseline of the rows that follow)
+    cases = [
+        (
+            "response: jsonable_encoder + json",
+            lambda: json.dumps(jsonable_encoder(body)).encode("utf-8"),
+            True,
+        ),
+        (f"response: dumps ({BACKEND})", lambda: dumps(body), False),
+        ("file: json indent=2", lambda: json.dumps(body, indent=2), True),
+        (f"file: dumps ({BACKEND})", lambda: dumps(body), False),
+    ]
+    print(f"{args.tasks} tasks, best of {args.repeat}")
+    for name, func, is_baseline in cases:
+        seconds = best_of(func, args.repeat)
+        if is_baseline:
+            baseline = seconds
+        print(f"  {name:<36} {seconds * 1000:8.2f} ms  x{baseline / seconds:5.1f}")
+    print(
+        f"  size: indent=2 {len(json.dumps(body, indent=2)) / 1024:.0f} KiB, "
+        f"compact {len(dumps(body)) / 1024:.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
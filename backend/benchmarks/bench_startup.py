@@ -0,0 +1,73 @@
+"""Compare cold-start loading of a JSON snapshot and the binary snapshot.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_startup --tasks 100000
+
+"ready" is the time until the tasks collection can answer a primary-key
+lookup; "first list" adds the first indexed query, which builds the hash
+indexes. The binary snapshot stores the indexed fields as column tables,
+so that build decodes only the records the query returns.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.core.indexes import IndexedCollection
+from app.core.models import Task
+from app.core.snapshot import read_snapshot, write_snapshot
+from benchmarks.bench_serialization import make_tasks
+
+INDEXES = ("assigned_to", "project_id", "status", "priority")
+
+
+def load_json(path):
+    with open(path, "rb") as f:
+        data = json.load(f)
+    pairs = data["collections"]["tasks"]
+    return IndexedCollection(
+        (record for _, record in pairs), indexes=INDEXES, record_type=Task
+    )
+
+
+def load_binary(path):
+    records = read_snapshot(path)["tasks"]
+    return IndexedCollection.from_mapping(records, indexes=INDEXES, record_type=Task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    tasks = {task["id"]: task for task in make_tasks(args.tasks)}
+    with tempfile.TemporaryDirectory() as data_dir:
+        json_path = os.path.join(data_dir, "snapshot.json")
+        with open(json_path, "w") as f:
+            json.dump({"version": 1, "collections": {"tasks": list(tasks.items())}}, f)
+        binary_path = os.path.join(data_dir, "snapshot.bin")
+        write_snapshot(binary_path, {"tasks": tasks}, columns={"tasks": INDEXES})
+
+        print(f"{args.tasks} tasks")
+        for name, load, path in (
+            ("json snapshot", load_json, json_path),
+            ("binary snapshot", load_binary, binary_path),
+        ):
+            start = time.perf_counter()
+            collection = load(path)
+            collection.get(args.tasks // 2)
+            ready = time.perf_counter() - start
+            collection.find("assigned_to", 7)
+            first_list = time.perf_counter() - start
+            size = os.path.getsize(path) / 2**20
+            print(
+                f"  {name:<16} ready {ready * 1000:8.1f} ms"
+                f"   first list {first_list * 1000:8.1f} ms   {size:6.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""Load-test the API on a seeded dataset and write the results as JSON.
+
+Run from ``backend/``::
+
+    python -m benchmarks.run --tasks 100000 --users 1000
+    python -m benchmarks.run --tasks 1000000 --server uvicorn --workers 2
+    python -m benchmarks.run --compare benchmarks/results/<previous>.json
+
+A synthetic dataset (users, their projects, and tasks spread across them) is
+written as a journal snapshot into a temporary ``TEST_DATA_DIR``, so the app
+loads it exactly as it would a real data directory. The app then runs either
+in process (``httpx.ASGITransport``, the default) or as a local uvicorn
+server, and each operation - login, list, get, create, update, delete and
+global search - is driven by ``--concurrency`` clients for a fixed number
+of requests. The first request of each kind is timed separately as its
+warm-up, since indexes are built on first use.
+
+Results (throughput, mean/p50/p90/p99/max latency and errors per operation,
+plus the dataset, configuration and git commit) are written to
+``benchmarks/results/`` unless ``--output`` says otherwise. ``--compare``
+prints the p50, p99 and throughput change against an earlier results file.
+Environment variables such as ``STORAGE_DURABILITY`` are passed through to
+the app, so configurations can be compared the same way.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+from app.core.security import PasswordHasher, calibrate
+from app.core.serialization import BACKEND
+from app.core.snapshot import write_snapshot
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+PASSWORD = "benchmark-password"
+# As app.main.SNAPSHOT_COLUMNS, so the server starts the way a compacted
+# production snapshot would have it start
+SNAPSHOT_COLUMNS = {
+    "projects": ("owner_id", "status"),
+    "tasks": ("assigned_to", "project_id", "status", "priority", "due_date"),
+}
+WORDS = (
+    "lab report essay thesis slides poster survey dataset chapter review draft "
+    "budget meeting outline sources interview prototype analysis summary quiz "
+    "seminar proposal agenda feedback notes revision figures appendix lecture"
+).split()
+STATUSES = ("todo", "in_progress", "review", "done")
+PRIORITIES = ("low", "medium", "high")
+OPERATIONS = ("login", "list", "get", "search", "create", "update", "delete")
+
+
+class Dataset:
+    """Synthetic users, projects and tasks with predictable ids.
+
+    User ids start at 2 (the app creates its test user with id 1). Task
+    ``n`` is assigned to user ``n % users``, so a user's tasks can be
+    picked without keeping a list of them.
+    """
+
+    def __init__(self, users, projects_per_user, tasks, seed):
+        self.users = users
+        self.projects_per_user = projects_per_user
+        self.tasks = tasks
+        self.seed = seed
+
+    def user_id(self, index):
+        return index + 2
+
+    def email(self, index):
+        return f"user{index}@bench.local"
+
+    def project_id(self, index, rng):
+        return (
+            index * self.projects_per_user + rng.randrange(self.projects_per_user) + 1
+        )
+
+    def task_id(self, index, rng):
+        per_user = (self.tasks - index - 1) // self.users + 1
+        return index + 1 + self.users * rng.randrange(per_user)
+
+    def state(self, password_hash):
+        rng = random.Random(self.seed)
+        created = datetime.now(timezone.utc).isoformat()
+        today = date.today()
+        users = {}
+        for index in range(self.users):
+            email = self.email(index)
+            users[email] = {
+                "id": self.user_id(index),
+                "username": f"user{index}",
+                "email": email,
+                "password": password_hash,
+                "full_name": f"{rng.choice(WORDS).title()} User {index}",
+                "created_at": created,
+            }
+        projects = {}
+        for index in range(self.users):
+            for number in range(self.projects_per_user):
+                project_id = index * self.projects_per_user + number + 1
+                projects[project_id] = {
+                    "id": project_id,
+                    "title": f"{rng.choice(WORDS).title()} project {project_id}",
+                    "description": " ".join(rng.choices(WORDS, k=8)),
+                    "status": "active",
+                    "owner_id": self.user_id(index),
+                    "created_at": created,
+                }
+        tasks = {}
+        for task_id in range(1, self.tasks + 1):
+            index = (task_id - 1) % self.users
+            due = today + timedelta(days=rng.randint(-30, 60))
+            tasks[task_id] = {
+                "id": task_id,
+                "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {task_id}",
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "project_id": self.project_id(index, rng),
+                "assigned_to": self.user_id(index),
+                "status": rng.choice(STATUSES),
+                "priority": rng.choice(PRIORITIES),
+                "created_at": created,
+                "due_date": due.isoformat() if rng.random() < 0.7 else None,
+            }
+        return {"users": users, "projects": projects, "tasks": tasks}
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"requests": 0, "errors": errors, "seconds": round(seconds, 3)}
+    ms = [value * 1000 for value in ordered]
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(ordered) / seconds, 1) if seconds else None,
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p90_ms": round(percentile(ms, 0.90), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+async def drive(request, count, concurrency):
+    """Send ``count`` requests from ``concurrency`` clients; time each one."""
+    latencies, errors = [], 0
+    remaining = iter(range(count))
+
+    async def client():
+        nonlocal errors
+        for number in remaining:
+            start = time.perf_counter()
+            response = await request(number)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(min(concurrency, count))))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_operations(client, dataset, args):
+    rng = random.Random(dataset.seed + 1)
+    active = range(min(args.active_users, dataset.users))
+    tokens = {}
+    for index in active:
+        response = await client.post(
+            "/api/auth/login",
+            json={"email": dataset.email(index), "password": PASSWORD},
+        )
+        response.raise_for_status()
+        tokens[index] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def user():
+        index = rng.choice(active)
+        return index, tokens[index]
+
+    created = []
+
+    async def login(_):
+        index = rng.choice(active)
+        body = {"email": dataset.email(index), "password": PASSWORD}
+        return await client.post("/api/auth/login", json=body)
+
+    async def list_tasks(_):
+        _, headers = user()
+        return await client.get(
+            "/api/tasks", params={"limit": args.page_size}, headers=headers
+        )
+
+    async def get_task(_):
+        index, headers = user()
+        task_id = dataset.task_id(index, rng)
+        return await client.get(f"/api/tasks/{task_id}", headers=headers)
+
+    async def search(_):
+        _, headers = user()
+        return await client.get(
+            "/api/search/global", params={"q": rng.choice(WORDS)}, headers=headers
+        )
+
+    async def create(_):
+        index, headers = user()
+        body = {
+            "title": f"{rng.choice(WORDS).title()} benchmark task",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "project_id": dataset.project_id(index, rng),
+            "priority": rng.choice(PRIORITIES),
+        }
+        response = await client.post("/api/tasks", json=body, headers=headers)
+        if response.status_code < 400:
+            created.append((headers, response.json()["id"]))
+        return response
+
+    async def update(number):
+        headers, task_id = created[number % len(created)]
+        body = {"status": STATUSES[number % len(STATUSES)]}
+        return await client.put(f"/api/tasks/{task_id}", json=body, headers=headers)
+
+    async def delete(number):
+        headers, task_id = created[number]
+        return await client.delete(f"/api/tasks/{task_id}", headers=headers)
+
+    requests = {
+        "login": (login, args.login_requests),
+        "list": (list_tasks, args.requests),
+        "get": (get_task, args.requests),
+        "search": (search, args.requests),
+        "create": (create, args.requests),
+        "update": (update, args.requests),
+        "delete": (delete, None),
+    }
+    warmup, results = {}, {}
+    for name in args.operations:
+        request, count = requests[name]
+        if name in ("update", "delete") and not created:
+            print(f"  {name:<7} skipped: needs tasks from the create operation")
+            continue
+        if name == "delete":
+            count = len(created)
+        elif name not in ("create",):
+            # Untimed in the totals: the first request pays for lazy index builds
+            start = time.perf_counter()
+            await request(0)
+            warmup[name] = round((time.perf_counter() - start) * 1000, 3)
+        results[name] = await drive(request, count, args.concurrency)
+        result = results[name]
+        print(
+            f"  {name:<7} {result['throughput_rps']:>9} req/s"
+            f"  p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms"
+            f"  errors {result['errors']}"
+        )
+    return warmup, results
+
+
+async def run_in_process(dataset, args):
+    start = time.perf_counter()
+    main = importlib.import_module("app.main")
+    startup = time.perf_counter() - start
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            warmup, results = await run_operations(client, dataset, args)
+    finally:
+        main.writer.close()
+        main.password_hasher.close()
+    return startup, warmup, results
+
+
+async def run_uvicorn(dataset, args, env):
+    command = [
+        sys.executable,
+        *("-m", "uvicorn", "app.main:app", "--log-level", "warning"),
+        *("--port", str(args.port), "--workers", str(args.workers)),
+    ]
+    env = {**env, "WEB_CONCURRENCY": str(args.workers)}
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=base_url, timeout=None, limits=limits
+        ) as client:
+            start = time.perf_counter()
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - start > args.startup_timeout:
+                    raise RuntimeError("uvicorn did not become ready in time")
+                await asyncio.sleep(0.05)
+            startup = time.perf_counter() - start
+            warmup, results = await run_operations(client, dataset, args)
+    finally:
+        server.terminate()
+        server.wait()
+    return startup, warmup, results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"vs {baseline_path} ({baseline.get('git_commit')})")
+    for name, result in results["operations"].items():
+        before = baseline.get("operations", {}).get(name)
+        if before is None:
+            continue
+        changes = [
+            f"{key} {before[key]:.2f} -> {result[key]:.2f} ({result[key] / before[key]:.2f}x)"
+            for key in ("p50_ms", "p99_ms", "throughput_rps")
+            if before.get(key) and result.get(key)
+        ]
+        print(f"  {name:<7} " + "  ".join(changes))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects-per-user", type=int, default=5)
+    parser.add_argument(
+        "--active-users", type=int, default=100, help="users that send requests"
+    )
+    parser.add_argument("--requests", type=int, default=1000, help="per operation")
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--operations",
+        type=lambda value: value.split(","),
+        default=list(OPERATIONS),
+        help="comma separated subset of " + ",".join(OPERATIONS),
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn only")
+    parser.add_argument("--port", type=int, default=8765, help="uvicorn only")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument(
+        "--hash-target-ms",
+        type=float,
+        default=float(os.getenv("PASSWORD_HASH_TARGET_MS", "50")),
+    )
+    parser.add_argument("--output", help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    unknown = set(args.operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    if args.tasks < args.users:
+        parser.error("--tasks must be at least --users")
+    return args
+
+
+def main():
+    args = parse_args()
+    dataset = Dataset(args.users, args.projects_per_user, args.tasks, args.seed)
+    # Pin the work factor so seeded hashes match what the app expects and
+    # logins measure verification, not rehashing
+    iterations = int(os.getenv("PASSWORD_HASH_ITERATIONS", "0")) or calibrate(
+        args.hash_target_ms
+    )
+    started_at = datetime.now(timezone.utc)
+
+    with tempfile.TemporaryDirectory(prefix="campusconnect-bench-") as data_dir:
+        print(f"Seeding {args.users} users, {args.tasks} tasks into {data_dir}")
+        start = time.perf_counter()
+        password_hash = PasswordHasher(iterations=iterations).hash(PASSWORD)
+        snapshot_path = os.path.join(data_dir, "snapshot.bin")
+        snapshot_bytes = write_snapshot(
+            snapshot_path, dataset.state(password_hash), columns=SNAPSHOT_COLUMNS
+        )
+        seed_seconds = time.perf_counter() - start
+
+        env = {
+            "TEST_DATA_DIR": data_dir,
+            "PASSWORD_HASH_ITERATIONS": str(iterations),
+            "PROFILE_SAMPLE_RATE": "0",
+        }
+        os.environ.update(env)
+        print(f"Running on {args.server}")
+        if args.server == "asgi":
+            run = run_in_process(dataset, args)
+        else:
+            run = run_uvicorn(dataset, args, os.environ.copy())
+        startup, warmup, operations = asyncio.run(run)
+
+    results = {
+        "benchmark": "api",
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": BACKEND,
+        "config": {**vars(args), "password_hash_iterations": iterations},
+        "dataset": {
+            "users": dataset.users,
+            "projects": dataset.users * dataset.projects_per_user,
+            "tasks": dataset.tasks,
+            "snapshot_bytes": snapshot_bytes,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "startup_seconds": round(startup, 3),
+        "warmup_ms": warmup,
+        "operations": operations,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = started_at.strftime("%Y%m%d-%H%M%S")
+        name = f"api-{results['git_commit'] or 'unknown'}-{stamp}.json"
+        output = os.path.join(RESULTS_DIR, name)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
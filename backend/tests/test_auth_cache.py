@@ -0,0 +1,81 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from app.core.auth import TokenCache
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import ALGORITHM, SECRET_KEY, app, authenticate  # noqa: E402
+
+client = TestClient(app)
+
+
+def _login_headers():
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache stays within maxsize"""
+    cache = TokenCache(maxsize=2, ttl=60)
+    expires = time.time() + 60
+    cache.put("a", "a@example.com", expires)
+    cache.put("b", "b@example.com", expires)
+    assert cache.get("a") == "a@example.com"
+    cache.put("c", "c@example.com", expires)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a@example.com"
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_respects_token_expiry():
+    """Test that entries are not served past the token's exp"""
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.put("old", "a@example.com", time.time() - 1)
+    assert cache.get("old") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_repeated_requests_hit_the_cache():
+    """Test that a session's token is only verified once"""
+    headers = _login_headers()
+    before = authenticate.cache.stats()
+    for _ in range(3):
+        response = client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["email"] == "test@example.com"
+    after = authenticate.cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+
+
+def test_expired_and_invalid_tokens_are_rejected():
+    """Test 401 responses for bad tokens"""
+    expired = jwt.encode(
+        {
+            "sub": "test@example.com",
+            "exp": datetime.now(timezone.utc) - timedelta(minutes=1),
+        },
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+    response = client.get(
+        "/api/auth/me", headers={"Authorization": f"Bearer {expired}"}
+    )
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token expired"
+
+    response = client.get(
+        "/api/projects", headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+    assert client.get("/api/tasks/1").status_code == 401
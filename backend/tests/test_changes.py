@@ -0,0 +1,71 @@
+from app.core.changes import ChangeTracker
+from app.core.indexes import IndexedCollection
+
+
+def _tracked(**kwargs):
+    tasks = IndexedCollection([{"id": 1, "title": "Loaded"}])
+    tracker = ChangeTracker(**kwargs)
+    tracker.watch(tasks, "tasks")
+    return tasks, tracker
+
+
+def test_versions_follow_mutations():
+    """Test collection and record versions"""
+    tasks, tracker = _tracked()
+    assert tracker.collection_version("tasks") == 0
+    tasks.insert({"id": 2})
+    tasks.update(1, {"title": "Edited"})
+    assert tracker.collection_version("tasks") == 2
+    assert tracker.record_version("tasks", 1) == 2
+    assert tracker.record_version("tasks", 2) == 1
+    tasks.remove(2)
+    assert tracker.record_version("tasks", 2) == 0
+
+
+def test_changes_since_token():
+    """Test that only entries after the token are returned, once each"""
+    tasks, tracker = _tracked()
+    token = tracker.token()
+    tasks.insert({"id": 2})
+    tasks.update(2, {"title": "Two"})
+    tasks.update(1, {"title": "Edited"})
+    tasks.remove(1)
+    entries = tracker.changes_since(token)
+    assert [(r["id"], deleted) for _, r, deleted in entries] == [(2, False), (1, True)]
+    assert tracker.changes_since(tracker.token()) == []
+    assert tracker.changes_since(None) is None
+    assert tracker.changes_since("other.0") is None
+
+
+def test_trimmed_tombstones_force_a_reset():
+    """Test that tokens older than the trimmed log need a full resync"""
+    tasks, tracker = _tracked(max_tombstones=1)
+    token = tracker.token()
+    tasks.insert({"id": 2})
+    tasks.remove(2)
+    middle = tracker.token()
+    tasks.remove(1)
+    assert tracker.changes_since(token) is None
+    assert [r["id"] for _, r, _ in tracker.changes_since(middle)] == [1]
+
+
+def test_sequence_follows_storage_position():
+    """Test that changes are numbered after the storage's recorded ops"""
+    position = [5]
+    tasks, tracker = _tracked(epoch="shared", position=lambda: position[0])
+    assert tracker.token() == "shared.5"
+    assert tracker.record_version("tasks", 1) == 5
+    # Ops on unwatched collections still advance the sequence
+    position[0] = 7
+    tasks.update(1, {"title": "Local"})
+    assert tracker.record_version("tasks", 1) == 8
+
+    # Another worker's ops, read up to position 11, are stamped 11
+    position[0] = 11
+    with tracker.replaying():
+        tasks.insert({"id": 2})
+        tasks.remove(1)
+    assert tracker.token() == "shared.11"
+    assert tracker.record_version("tasks", 2) == 11
+    assert [r["id"] for _, r, _ in tracker.changes_since("shared.10")] == [2, 1]
+    assert tracker.changes_since("shared.4") is None
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import tempfile
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main  # noqa: E402
+from app.core.events import RESYNC, EventHub  # noqa: E402
+from app.core.indexes import IndexedCollection  # noqa: E402
+
+
+def _data(message):
+    return json.loads(message.split("data: ", 1)[1])
+
+
+def test_changes_reach_only_the_owner():
+    """Test that events are routed by the record's owner field"""
+
+    async def scenario():
+        tasks = IndexedCollection()
+        hub = EventHub()
+        hub.watch(tasks, "tasks", "assigned_to", version=lambda: "v1")
+        mine, theirs = hub.subscribe(1), hub.subscribe(2)
+        tasks.insert({"id": 1, "assigned_to": 1})
+        tasks.remove(1)
+        first = await mine.get(timeout=1)
+        assert first.startswith("id: v1\nevent: change\n")
+        assert _data(first)["record"] == {"id": 1, "assigned_to": 1}
+        assert _data(await mine.get(timeout=1)) == {
+            "collection": "tasks",
+            "op": "del",
+            "id": 1,
+        }
+        assert await theirs.get(timeout=0.01) is None
+        hub.unsubscribe(mine)
+        hub.unsubscribe(theirs)
+        assert len(hub) == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_told_to_resync():
+    """Test that a full queue is replaced by one resync event"""
+
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        slow = hub.subscribe(1)
+        for n in range(5):
+            hub.publish(1, "change", {"n": n})
+        assert hub.dropped == 3
+        assert await slow.get(timeout=1) is RESYNC
+        assert slow.queue.empty()
+        hub.publish(1, "change", {"n": 5})
+        assert _data(await slow.get(timeout=1)) == {"n": 5}
+
+    asyncio.run(scenario())
+
+
+def test_events_route_requires_a_token():
+    """Test that the stream needs a token in the header or the query"""
+    assert TestClient(main.app).get("/api/events").status_code == 401
+
+
+async def _open_stream(query):
+    """Call the app for ``/api/events``; returns (messages, disconnect, task).
+
+    httpx's ASGI transport buffers whole responses, so an endless stream
+    is driven through the ASGI interface directly.
+    """
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await messages.put(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/events",
+        "raw_path": b"/api/events",
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    task = asyncio.create_task(main.app(scope, receive, send))
+    return messages, disconnected, task
+
+
+async def _next_event(messages):
+    message = await asyncio.wait_for(messages.get(), timeout=5)
+    assert message["type"] == "http.response.body" and message["more_body"]
+    return message["body"].decode()
+
+
+def test_events_route_streams_changes():
+    """Test the ready event, a change after it, and closing on disconnect"""
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as client:
+            login = await client.post(
+                "/api/auth/login",
+                json={"email": "test@example.com", "password": "testpassword"},
+            )
+            token = login.json()["access_token"]
+            messages, disconnected, task = await _open_stream(f"token={token}")
+
+            start = await asyncio.wait_for(messages.get(), timeout=5)
+            assert start["status"] == 200
+            assert (b"content-type", b"text/event-stream; charset=utf-8") in start[
+                "headers"
+            ]
+            ready = await _next_event(messages)
+            assert ready.startswith(f"retry: 3000\nid: {main.changes.token()}\n")
+            assert "event: ready" in ready
+
+            created = await client.post(
+                "/api/tasks",
+                json={"title": "Streamed"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            change = await _next_event(messages)
+            assert change.startswith(f"id: {main.changes.token()}\nevent: change\n")
+            assert _data(change)["record"]["id"] == created.json()["id"]
+
+            disconnected.set()
+            await asyncio.wait_for(task, timeout=5)
+        assert len(main.event_hub) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import pytest
+
+from app.core.indexes import CountIndex, IndexedCollection, SortedIndex, paginate
+
+
+def _tasks():
+    return IndexedCollection(
+        [
+            {"id": 1, "assigned_to": 1, "project_id": 10},
+            {"id": 2, "assigned_to": 1, "project_id": 11},
+            {"id": 3, "assigned_to": 2, "project_id": 10},
+        ],
+        indexes=("assigned_to", "project_id"),
+    )
+
+
+def test_lookup_by_primary_and_foreign_keys():
+    """Test primary key and secondary index lookups"""
+    tasks = _tasks()
+    assert tasks.get(2)["project_id"] == 11
+    assert tasks.get(99) is None
+    assert [t["id"] for t in tasks.find("assigned_to", 1)] == [1, 2]
+    assert [t["id"] for t in tasks.find("project_id", 10)] == [1, 3]
+    assert tasks.find("project_id", 12) == []
+
+
+def test_update_moves_record_between_buckets():
+    """Test that updating an indexed field reindexes the record"""
+    tasks = _tasks()
+    tasks.update(1, {"project_id": 11})
+    assert [t["id"] for t in tasks.find("project_id", 10)] == [3]
+    assert sorted(t["id"] for t in tasks.find("project_id", 11)) == [1, 2]
+
+
+def test_remove_and_next_id():
+    """Test that removed records leave the indexes and ids stay unique"""
+    tasks = _tasks()
+    tasks.remove(3)
+    assert tasks.find("assigned_to", 2) == []
+    assert 3 not in tasks
+    assert len(tasks) == 2
+    assert tasks.next_id() == 4
+    with pytest.raises(KeyError):
+        tasks.insert({"id": 1})
+
+
+def test_where_intersects_indexes():
+    """Test that where matches every criterion"""
+    tasks = _tasks()
+    assert [t["id"] for t in tasks.where(assigned_to=1, project_id=10)] == [1]
+    assert tasks.where(assigned_to=2, project_id=11) == []
+    assert tasks.where(assigned_to=3) == []
+    assert len(tasks.where()) == 3
+
+
+def test_paginate_walks_pages_by_id():
+    """Test that cursors walk every record exactly once in id order"""
+    records = [{"id": i} for i in (5, 3, 9, 1, 7)]
+    page, cursor = paginate(records, limit=2)
+    assert [r["id"] for r in page] == [1, 3] and cursor == 3
+    page, cursor = paginate(records, limit=2, cursor=cursor)
+    assert [r["id"] for r in page] == [5, 7] and cursor == 7
+    page, cursor = paginate(records, limit=2, cursor=cursor)
+    assert [r["id"] for r in page] == [9] and cursor is None
+    assert [r["id"] for r in paginate(records)[0]] == [1, 3, 5, 7, 9]
+
+
+def test_sorted_index_follows_mutations():
+    """Test that the sorted index answers ranges as records change"""
+    tasks = _tasks()
+    by_project = SortedIndex(
+        tasks, lambda t: (t["project_id"], t["id"]) if t["project_id"] else None
+    )
+    assert [t["id"] for t in by_project.range((10,), (11,))] == [1, 3]
+    tasks.update(3, {"project_id": 12})
+    tasks.insert({"id": 4, "assigned_to": 1, "project_id": 10})
+    tasks.insert({"id": 5, "assigned_to": 1, "project_id": None})
+    tasks.remove(1)
+    assert [t["id"] for t in by_project.range((10,), (13,))] == [4, 2, 3]
+    assert by_project.count((11,), (13,)) == 2
+    assert [t["id"] for t in by_project.range((0,), (99,), limit=1)] == [4]
+
+
+def test_count_index_follows_mutations():
+    """Test that per-group counts stay in step with the collection"""
+    tasks = _tasks()
+    counts = CountIndex(tasks, lambda t: t.get("assigned_to"), ("project_id",))
+    assert counts.counts(1) == {"total": 2, "project_id": {10: 1, 11: 1}}
+    tasks.update(1, {"project_id": 11})
+    tasks.update(3, {"assigned_to": 1})
+    tasks.insert({"id": 4, "assigned_to": None, "project_id": 10})
+    assert counts.counts(1) == {"total": 3, "project_id": {10: 1, 11: 2}}
+    assert counts.counts(2) == {"total": 0, "project_id": {}}
+    tasks.remove(2)
+    tasks.remove(3)
+    assert counts.counts(1) == {"total": 1, "project_id": {11: 1}}
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.metrics import Registry  # noqa: E402
+
+client = TestClient(app)
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    registry.gauge("queue_depth", "Depth.", collect=lambda: 3)
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a\\"b"} 3' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 7.65" in lines
+    assert "latency_seconds_count 4" in lines
+    assert "queue_depth 3" in lines
+
+
+def test_metrics_endpoint_labels_routes_by_template():
+    login = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    task = client.post("/api/tasks", json={"title": "Metric"}, headers=headers).json()
+    client.get(f"/api/tasks/{task['id']}", headers=headers)
+    client.get("/api/tasks/999999", headers=headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    route = 'route="/api/tasks/{task_id}"'
+    assert f'http_requests_total{{method="GET",{route},status="200"}} 1' in text
+    assert f'http_requests_total{{method="GET",{route},status="404"}} 1' in text
+    assert f"/api/tasks/{task['id']}" not in text
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/api/tasks"}' in text
+    )
+    assert "storage_write_duration_seconds_count" in text
+    assert 'collection_records{collection="tasks"}' in text
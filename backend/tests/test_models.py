@@ -0,0 +1,29 @@
+import pytest
+
+from app.core.indexes import IndexedCollection
+from app.core.models import Task
+
+
+def test_record_behaves_like_a_mapping():
+    """Test the dict-style interface used by indexes and storage"""
+    task = Task.from_dict({"id": 1, "title": "Read", "legacy_field": "dropped"})
+    assert task["id"] == 1 and task.get("status") == "todo"
+    assert task.get("legacy_field", "missing") == "missing"
+    assert dict(task) == task.to_dict()
+    assert not hasattr(task, "__dict__")
+    with pytest.raises(KeyError):
+        task["legacy_field"]
+    with pytest.raises(KeyError):
+        task.update({"colour": "red"})
+
+
+def test_collection_converts_inserted_dicts():
+    """Test that a typed collection stores records of its type"""
+    tasks = IndexedCollection(
+        [{"id": 1, "title": "Read", "status": "todo"}],
+        indexes=("status",),
+        record_type=Task,
+    )
+    assert isinstance(tasks[1], Task)
+    tasks.update(1, {"status": "done"})
+    assert [t["id"] for t in tasks.find("status", "done")] == [1]
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import time
+from collections import deque
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main  # noqa: E402
+from app.core.profiling import (  # noqa: E402
+    ProfilingMiddleware,
+    _timings,
+    server_timing,
+    span,
+    timed,
+)
+
+
+@timed("lookup")
+def _lookup():
+    return 42
+
+
+def _profiled_app(sample_rate, threshold):
+    app = FastAPI()
+    reports = deque(maxlen=5)
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=sample_rate,
+        threshold=threshold,
+        reports=reports,
+    )
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with span("auth"):
+            pass
+        return {"id": item_id, "value": _lookup()}
+
+    @app.get("/stream")
+    async def stream():
+        def chunks():
+            yield b"first\n"
+            time.sleep(0.2)
+            yield b"last\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return TestClient(app), reports
+
+
+def test_spans_are_inert_outside_a_profiled_request():
+    assert _timings.get() is None
+    with span("auth"):
+        pass
+    assert _lookup() == 42
+
+
+def test_spans_accumulate_per_phase():
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        _lookup()
+        _lookup()
+        with span("auth"):
+            pass
+    finally:
+        _timings.reset(token)
+    assert set(timings) == {"lookup", "auth"}
+    assert server_timing({"auth": 0.0015}, 0.004) == "auth;dur=1.50, total;dur=4.00"
+
+
+def test_sampled_requests_report_phases():
+    client, reports = _profiled_app(sample_rate=1, threshold=0)
+    response = client.get("/items/7")
+    assert response.json() == {"id": 7, "value": 42}
+    names = [
+        part.split(";")[0] for part in response.headers["server-timing"].split(", ")
+    ]
+    assert names[-1] == "total" and {"auth", "lookup"} <= set(names)
+
+    report = reports[-1]
+    assert report["route"] == "/items/{item_id}" and report["path"] == "/items/7"
+    assert report["status"] == 200
+    assert {"auth", "lookup"} <= set(report["spans_ms"])
+    assert "function calls" in report["profile"]
+
+
+def test_fast_and_unsampled_requests_are_not_reported():
+    client, reports = _profiled_app(sample_rate=1, threshold=60)
+    assert "server-timing" in client.get("/items/1").headers
+    assert not reports
+
+    client, reports = _profiled_app(sample_rate=0, threshold=0)
+    assert "server-timing" not in client.get("/items/1").headers
+    assert not reports
+
+
+def test_streams_are_measured_to_the_response_start():
+    client, reports = _profiled_app(sample_rate=1, threshold=0.1)
+    assert client.get("/stream").text == "first\nlast\n"
+    assert not reports
+    client, reports = _profiled_app(sample_rate=1, threshold=0)
+    client.get("/stream")
+    assert reports[-1]["duration_ms"] < 200
+
+
+def test_profiles_are_for_admins_only(monkeypatch):
+    client = TestClient(main.app)
+    token = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword"},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    monkeypatch.setattr(main, "PROFILE_SAMPLE_RATE", 0.5)
+    assert client.get("/api/debug/profiles", headers=headers).status_code == 403
+    monkeypatch.setattr(main, "PROFILE_ADMINS", {"test@example.com"})
+    response = client.get("/api/debug/profiles", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profiles"] == []
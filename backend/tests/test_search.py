@@ -0,0 +1,80 @@
+import os
+import tempfile
+import uuid
+
+from app.core.indexes import IndexedCollection
+from app.core.search import SearchIndex
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+client = TestClient(app)
+
+
+def _index():
+    tasks = IndexedCollection(
+        [
+            {"id": 1, "title": "Write report", "description": "quarterly numbers"},
+            {"id": 2, "title": "Review", "description": "report draft"},
+            {"id": 3, "title": "Reporting dashboard", "description": ""},
+        ]
+    )
+    index = SearchIndex()
+    index.watch(tasks, "tasks", {"title": 2, "description": 1})
+    return tasks, index
+
+
+def _ids(hits):
+    return [doc_id for _, doc_id in hits["tasks"]]
+
+
+def test_exact_prefix_and_substring_matches_are_ranked():
+    """Test that exact title matches outrank prefix and description matches"""
+    _, index = _index()
+    assert _ids(index.search("report", ("tasks",))) == [1, 3, 2]
+    assert _ids(index.search("epor", ("tasks",))) == [3, 1, 2]
+
+
+def test_all_terms_must_match():
+    """Test multi-term queries"""
+    _, index = _index()
+    assert _ids(index.search("report draft", ("tasks",))) == [2]
+    assert _ids(index.search("report missing", ("tasks",))) == []
+
+
+def test_index_follows_collection_mutations():
+    """Test that inserts, updates and removes are reflected in results"""
+    tasks, index = _index()
+    tasks.insert({"id": 4, "title": "Plan sprint", "description": ""})
+    tasks.update(1, {"title": "Write summary"})
+    tasks.remove(3)
+    assert _ids(index.search("sprint", ("tasks",))) == [4]
+    assert _ids(index.search("report", ("tasks",))) == [2]
+    assert len(index) == 3
+
+
+def test_limit_returns_top_k():
+    """Test that limit keeps only the best hits"""
+    _, index = _index()
+    assert _ids(index.search("rep", ("tasks",), limit=1)) == [3]
+
+
+def test_global_search_endpoint():
+    """Test that new projects are searchable through the API"""
+    login = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    word = f"zebra{uuid.uuid4().hex[:6]}"
+    client.post("/api/projects", json={"title": f"The {word} project"}, headers=headers)
+
+    response = client.get("/api/search/global", params={"q": word[:-2]})
+    assert response.status_code == 200
+    assert [p["title"] for p in response.json()["projects"]] == [f"The {word} project"]
+
+    response = client.get("/api/search/global", params={"q": "x"})
+    assert response.json() == {"projects": [], "tasks": [], "users": []}
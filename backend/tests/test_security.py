@@ -0,0 +1,146 @@
+import asyncio
+import os
+import tempfile
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app import main  # noqa: E402
+from app.core.models import User  # noqa: E402
+from app.core.security import (  # noqa: E402
+    MIN_ITERATIONS,
+    HasherBusy,
+    PasswordHasher,
+    calibrate,
+)
+
+client = TestClient(main.app)
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(iterations=MIN_ITERATIONS)
+    stored = hasher.hash("secret")
+    assert stored.startswith(f"pbkdf2_sha256${MIN_ITERATIONS}$")
+    assert "secret" not in stored
+    assert hasher.hash("secret") != stored  # salted
+    assert hasher.verify("secret", stored) == (True, False)
+    assert hasher.verify("wrong", stored) == (False, False)
+
+
+def test_weaker_and_plaintext_hashes_need_rehash():
+    old = PasswordHasher(iterations=MIN_ITERATIONS)
+    new = PasswordHasher(iterations=MIN_ITERATIONS * 2)
+    assert new.verify("secret", old.hash("secret")) == (True, True)
+    # Never downgrade a stronger hash
+    assert old.verify("secret", new.hash("secret")) == (True, False)
+    assert new.verify("secret", "secret") == (True, True)
+    assert new.verify("wrong", "secret") == (False, False)
+    assert new.verify("secret", "") == (False, False)
+
+
+def test_calibrate_respects_minimum():
+    assert calibrate(0) == MIN_ITERATIONS
+    assert calibrate(1000) % 10_000 == 0
+
+
+def test_admission_limit():
+    hasher = PasswordHasher(iterations=MIN_ITERATIONS, max_pending=1)
+
+    async def storm():
+        return await asyncio.gather(
+            hasher.hash_async("a"), hasher.hash_async("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(storm())
+    assert isinstance(results[1], HasherBusy)
+    assert hasher.verify("a", results[0]) == (True, False)
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.pending == 0
+
+
+def test_register_stores_hash():
+    response = client.post(
+        "/api/auth/register",
+        json={
+            "username": "hashed",
+            "email": "hashed@example.com",
+            "password": "secret123",
+            "full_name": "Hashed User",
+        },
+    )
+    assert response.status_code == 200
+    stored = main.users_db["hashed@example.com"]["password"]
+    assert stored.startswith("pbkdf2_sha256$")
+    response = client.post(
+        "/api/auth/login", json={"email": "hashed@example.com", "password": "secret123"}
+    )
+    assert response.status_code == 200
+
+
+def test_login_rehashes_plaintext_password():
+    main.users_db.insert(
+        User(
+            id=len(main.users_db) + 1,
+            username="legacy",
+            email="legacy@example.com",
+            password="plaintext",
+            full_name="Legacy User",
+            created_at="2024-01-01T00:00:00+00:00",
+        )
+    )
+    response = client.post(
+        "/api/auth/login", json={"email": "legacy@example.com", "password": "wrong"}
+    )
+    assert response.status_code == 401
+    assert main.users_db["legacy@example.com"]["password"] == "plaintext"
+
+    response = client.post(
+        "/api/auth/login", json={"email": "legacy@example.com", "password": "plaintext"}
+    )
+    assert response.status_code == 200
+    stored = main.users_db["legacy@example.com"]["password"]
+    assert stored.startswith("pbkdf2_sha256$")
+    assert main.password_hasher.verify("plaintext", stored) == (True, False)
+
+
+def test_login_busy_returns_503(monkeypatch):
+    monkeypatch.setattr(main.password_hasher, "max_pending", 0)
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword"},
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_test_user_password_is_hashed():
+    stored = main.users_db["test@example.com"]["password"]
+    assert stored.startswith("pbkdf2_sha256$")
+
+
+def test_dummy_hash_follows_iterations():
+    hasher = PasswordHasher(iterations=MIN_ITERATIONS)
+    dummy = hasher.dummy_hash()
+    assert dummy.startswith(f"pbkdf2_sha256${MIN_ITERATIONS}$")
+    assert hasher.dummy_hash() == dummy
+    hasher.iterations = MIN_ITERATIONS * 2
+    assert hasher.dummy_hash().startswith(f"pbkdf2_sha256${MIN_ITERATIONS * 2}$")
+    assert hasher.verify("anything", None) == (False, False)
+
+
+def test_login_unknown_email_still_hashes(monkeypatch):
+    checked = []
+    verify = main.password_hasher.verify
+
+    def spy(password, stored):
+        checked.append(stored)
+        return verify(password, stored)
+
+    monkeypatch.setattr(main.password_hasher, "verify", spy)
+    response = client.post(
+        "/api/auth/login", json={"email": "nobody@example.com", "password": "guess"}
+    )
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Incorrect email or password"
+    assert checked == [None, main.password_hasher.dummy_hash()]
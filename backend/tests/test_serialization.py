@@ -0,0 +1,19 @@
+from datetime import date
+
+from app.core.serialization import FastJSONResponse, dumps, loads
+
+
+def test_dumps_is_compact_and_round_trips():
+    """Test compact output, non-string keys and the str fallback"""
+    data = {"tasks": [{"id": 1, "title": "Café"}], 2: date(2026, 1, 5)}
+    encoded = dumps(data)
+    assert isinstance(encoded, bytes)
+    assert b" " not in encoded.replace("Café".encode("utf-8"), b"")
+    assert loads(encoded) == {"tasks": [{"id": 1, "title": "Café"}], "2": "2026-01-05"}
+
+
+def test_response_class_renders_with_dumps():
+    """Test that the default response class uses the fast encoder"""
+    response = FastJSONResponse({"ok": True})
+    assert response.body == b'{"ok":true}'
+    assert response.headers["content-type"] == "application/json"
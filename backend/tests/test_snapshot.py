@@ -0,0 +1,123 @@
+import json
+import os
+
+from app.core.indexes import MISSING, Deferred, IndexedCollection, SortedIndex
+from app.core.models import Task
+from app.core.snapshot import open_snapshot, read_snapshot, write_snapshot
+from app.core.storage import JournalStorage
+
+
+def _state():
+    return {
+        "users": {"a@example.com": {"id": 1, "email": "a@example.com"}},
+        "projects": {},
+        "tasks": {
+            i: {"id": i, "title": f"Task {i}", "status": "todo"} for i in (1, 2, 3)
+        },
+    }
+
+
+def test_snapshot_round_trip_is_lazy(tmp_path):
+    """Test that records come back as placeholders decoding to the originals"""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, _state())
+    state = read_snapshot(path)
+    assert list(state["tasks"]) == [1, 2, 3]
+    assert all(isinstance(record, Deferred) for record in state["tasks"].values())
+    assert state["tasks"][2].load() == {"id": 2, "title": "Task 2", "status": "todo"}
+    assert state["users"]["a@example.com"].load()["id"] == 1
+    assert state["projects"] == {}
+
+
+def test_snapshot_keeps_metadata(tmp_path):
+    """Test that extra header fields round-trip next to the records"""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, _state(), {"max_ids": {"tasks": 9}, "generation": 2})
+    state, meta = open_snapshot(path)
+    assert meta == {"max_ids": {"tasks": 9}, "generation": 2}
+    assert list(state["tasks"]) == [1, 2, 3]
+
+
+def test_collection_decodes_on_first_access(tmp_path):
+    """Test that a collection over a snapshot decodes and indexes lazily"""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, _state())
+    tasks = IndexedCollection.from_mapping(
+        read_snapshot(path)["tasks"], indexes=("status",), record_type=Task
+    )
+    assert len(tasks) == 3 and tasks.next_id() == 4
+    assert tasks._deferred == 3
+    assert tasks[2].title == "Task 2"
+    assert tasks._deferred == 2
+    tasks.update(3, {"status": "done"})
+    assert [t["id"] for t in tasks.find("status", "todo")] == [1, 2]
+    assert tasks._deferred == 0
+    tasks.remove(1)
+    assert [t["id"] for t in tasks.where(status="todo")] == [2]
+
+
+def test_indexes_build_from_columns(tmp_path):
+    """Test that indexes over a snapshot's columns decode no record"""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, _state(), columns={"tasks": ("status", "priority")})
+    records = read_snapshot(path)["tasks"]
+    # Tasks in _state() have no priority; the column marks it absent
+    assert records[1].fields(("status", "priority")) == ["todo", MISSING]
+    assert records[1].fields(("title",)) is None
+
+    tasks = IndexedCollection.from_mapping(
+        records, indexes=("status", "priority"), record_type=Task
+    )
+    tasks.update(2, {"status": "done"})
+    by_status = SortedIndex(tasks, lambda t: (t["status"], t["id"]), reads=("status",))
+    assert by_status.count(("done",), ("done", 99)) == 1
+    tasks._ensure_indexed()
+    assert tasks._deferred == 2
+    # Absent fields are indexed with the record type's default
+    assert [t["id"] for t in tasks.where(status="todo", priority="medium")] == [1, 3]
+    assert tasks._deferred == 0
+
+
+def test_compaction_copies_encoded_records(tmp_path):
+    """Test that compaction neither decodes nor loses untouched records"""
+    columns = {"tasks": ("status",)}
+    write_snapshot(str(tmp_path / JournalStorage.SNAPSHOT_FILE), _state(), None, columns)
+    engine = JournalStorage(str(tmp_path), columns=columns)
+    tasks = IndexedCollection.from_mapping(
+        engine.load()["tasks"], indexes=("status",), record_type=Task
+    )
+    engine.attach(lambda: {"tasks": tasks.as_dict()})
+    tasks.update(3, {"status": "done"})
+    engine.compact()
+    engine.close()
+    assert tasks._deferred == 2
+
+    engine = JournalStorage(str(tmp_path))
+    records = engine.load()["tasks"]
+    engine.close()
+    assert [records[k].fields(("status",)) for k in (1, 2, 3)] == [
+        ["todo"],
+        ["todo"],
+        ["done"],
+    ]
+    assert records[1].load() == {"id": 1, "title": "Task 1", "status": "todo"}
+    assert records[3].load()["status"] == "done"
+
+
+def test_journal_migrates_json_snapshot(tmp_path):
+    """Test that a version 1 JSON snapshot is read and replaced on compaction"""
+    legacy = os.path.join(tmp_path, JournalStorage.LEGACY_SNAPSHOT_FILE)
+    with open(legacy, "w") as f:
+        json.dump({"version": 1, "collections": {"tasks": [[5, {"id": 5}]]}}, f)
+    engine = JournalStorage(str(tmp_path))
+    state = engine.load()
+    assert state["tasks"] == {5: {"id": 5}}
+    engine.attach(lambda: state)
+    engine.compact()
+    engine.close()
+
+    assert not os.path.exists(legacy)
+    engine = JournalStorage(str(tmp_path))
+    state = engine.load()
+    engine.close()
+    assert state["tasks"][5].load() == {"id": 5}
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy import inspect  # noqa: E402
+
+from app.core.database import create_db_engine  # noqa: E402
+from app.core.repositories import SqlStorage  # noqa: E402
+from app.core.storage import StorageWriter, create_storage  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/campus.db", pool_size=2)
+    yield engine
+    engine.dispose()
+
+
+def _task(task_id, project_id, assigned_to=1):
+    return {
+        "id": task_id,
+        "title": f"Task {task_id}",
+        "description": "",
+        "project_id": project_id,
+        "assigned_to": assigned_to,
+        "status": "todo",
+        "priority": "medium",
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "due_date": None,
+    }
+
+
+def test_sql_storage_round_trip(engine):
+    """Test that puts and deletes are reloaded from the database"""
+    storage = SqlStorage(engine)
+    assert storage.load() == {"users": {}, "projects": {}, "tasks": {}}
+    user = {
+        "id": 1,
+        "username": "sqluser",
+        "email": "sql@example.com",
+        "password": "secret",
+        "full_name": "SQL User",
+        "created_at": "2024-01-01T00:00:00+00:00",
+    }
+    storage.put("users", user["email"], user)
+    storage.put("tasks", 1, _task(1, 10))
+    storage.put("tasks", 2, _task(2, 10))
+    storage.put("tasks", 1, dict(_task(1, 10), status="done"))
+    storage.delete("tasks", 2)
+
+    state = SqlStorage(engine).load()
+    assert state["users"]["sql@example.com"]["username"] == "sqluser"
+    assert list(state["tasks"]) == [1]
+    assert state["tasks"][1]["status"] == "done"
+
+
+def test_foreign_keys_are_indexed(engine):
+    """Test that lookup columns carry database indexes"""
+    SqlStorage(engine).load()
+    indexed = {
+        column
+        for table in ("projects", "tasks")
+        for index in inspect(engine).get_indexes(table)
+        for column in index["column_names"]
+    }
+    assert {"owner_id", "assigned_to", "project_id"} <= indexed
+
+
+def test_batched_writer(engine):
+    """Test that a batch written through the writer is reloaded"""
+    storage = SqlStorage(engine)
+    storage.load()
+    writer = StorageWriter(storage, durability="group")
+
+    async def persist():
+        await writer.persist(
+            [
+                ("put", "tasks", i, _task(i, 10 + i % 2, assigned_to=i % 3))
+                for i in range(1, 7)
+            ]
+        )
+
+    asyncio.run(persist())
+    writer.close()
+
+    tasks = SqlStorage(create_db_engine(str(engine.url))).load()["tasks"]
+    assert list(tasks) == [1, 2, 3, 4, 5, 6]
+    assert tasks[4]["project_id"] == 10
+    assert tasks[3]["assigned_to"] == 0
+
+
+def test_sql_is_single_worker_only():
+    """Test that multi-worker mode refuses the sql engine"""
+    with pytest.raises(ValueError):
+        create_storage("/tmp", engine="sql", shared=True)
+
+
+def test_in_memory_database_is_shared_with_writer_thread():
+    """Test that the writer thread sees tables created by load"""
+    engine = create_db_engine("sqlite://")
+    storage = SqlStorage(engine)
+    storage.load()
+    writer = StorageWriter(storage)
+    asyncio.run(writer.persist([("put", "tasks", 1, _task(1, 10))]))
+    # Closing the writer disposes the engine and with it the database
+    assert list(SqlStorage(engine).load()["tasks"]) == [1]
+    writer.close()
+
+
+def test_deleted_ids_are_not_reused(engine):
+    """Test that the highest id survives deleting its record"""
+    storage = SqlStorage(engine)
+    storage.load()
+    storage.put("tasks", 1, _task(1, 10))
+    storage.put("tasks", 2, _task(2, 10))
+    storage.delete("tasks", 2)
+
+    reloaded = SqlStorage(engine)
+    assert list(reloaded.load()["tasks"]) == [1]
+    assert reloaded.max_ids["tasks"] == 2
@@ -0,0 +1,454 @@
+import asyncio
+import json
+import os
+import threading
+
+from app.core.indexes import IndexedCollection
+from app.core.storage import (
+    JournalStorage,
+    JsonFileStorage,
+    MemoryStorage,
+    StorageWriter,
+    WorkerLock,
+    create_storage,
+)
+
+
+def _reopen(data_dir, **kwargs):
+    engine = JournalStorage(data_dir, **kwargs)
+    return engine, engine.load()
+
+
+def test_journal_replays_puts_and_deletes(tmp_path):
+    """Test that mutations survive a restart through the journal"""
+    engine, state = _reopen(str(tmp_path))
+    engine.put("tasks", 1, {"id": 1, "title": "First"})
+    engine.put("tasks", 2, {"id": 2, "title": "Second"})
+    engine.put("tasks", 1, {"id": 1, "title": "First (edited)"})
+    engine.delete("tasks", 2)
+    engine.put("users", "a@example.com", {"id": 1, "email": "a@example.com"})
+    engine.close()
+
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert state["tasks"] == {1: {"id": 1, "title": "First (edited)"}}
+    assert list(state["users"]) == ["a@example.com"]
+
+
+def test_journal_appends_one_line_per_mutation(tmp_path):
+    """Test that a write appends instead of rewriting the data files"""
+    engine, _ = _reopen(str(tmp_path))
+    engine.put("projects", 1, {"id": 1})
+    engine.put("projects", 2, {"id": 2})
+    engine.close()
+
+    with open(os.path.join(tmp_path, JournalStorage.JOURNAL_FILE)) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0]) == {"op": "gen", "g": 0}
+    assert json.loads(lines[2]) == {
+        "op": "put",
+        "c": "projects",
+        "k": 2,
+        "v": {"id": 2},
+    }
+
+
+def test_journal_compaction(tmp_path):
+    """Test that the journal is folded into a snapshot after enough writes"""
+    live = {"users": {}, "projects": {}, "tasks": {}}
+    engine, _ = _reopen(str(tmp_path), compact_every=3)
+    engine.attach(lambda: live)
+    for task_id in range(1, 5):
+        live["tasks"][task_id] = {"id": task_id}
+        engine.put("tasks", task_id, live["tasks"][task_id])
+    engine.close()
+
+    assert os.path.exists(os.path.join(tmp_path, JournalStorage.SNAPSHOT_FILE))
+    assert engine.pending == 1
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert sorted(state["tasks"]) == [1, 2, 3, 4]
+
+
+def test_journal_keeps_ids_of_deleted_records(tmp_path):
+    """Test that ids are not handed out again after compaction and restart"""
+    live = {"users": {}, "projects": {}, "tasks": {}}
+    engine, _ = _reopen(str(tmp_path), compact_every=4)
+    engine.attach(lambda: live)
+    for task_id in (1, 2):
+        live["tasks"][task_id] = {"id": task_id}
+        engine.put("tasks", task_id, live["tasks"][task_id])
+    for task_id in (2, 1):
+        del live["tasks"][task_id]
+        engine.delete("tasks", task_id)
+    engine.close()
+    assert engine.pending == 0  # the last delete compacted
+
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert state["tasks"] == {}
+    assert engine.max_ids == {"tasks": 2}
+    tasks = IndexedCollection.from_mapping(state["tasks"], max_id=2)
+    assert tasks.next_id() == 3
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    """Test that a partially written entry does not break startup"""
+    engine, _ = _reopen(str(tmp_path))
+    engine.put("tasks", 1, {"id": 1})
+    engine.close()
+    with open(os.path.join(tmp_path, JournalStorage.JOURNAL_FILE), "a") as f:
+        f.write('{"op": "put", "c": "tasks", "k": 2, "v": {')
+
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert list(state["tasks"]) == [1]
+
+
+def test_journal_batch_is_all_or_nothing(tmp_path):
+    """Test that a multi-op write is one journal line replayed as a unit"""
+    engine, _ = _reopen(str(tmp_path))
+    for task_id in (1, 2, 3):
+        engine.put("tasks", task_id, {"id": task_id})
+    engine.write(engine.encode([("del", "tasks", 1, None), ("del", "tasks", 2, None)]))
+    engine.close()
+
+    path = os.path.join(tmp_path, JournalStorage.JOURNAL_FILE)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 5
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert list(state["tasks"]) == [3]
+
+    # A crash mid-append loses the whole batch, never half of it
+    with open(path, "w") as f:
+        f.write("\n".join(lines[:4]) + "\n" + lines[4][:-10])
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert sorted(state["tasks"]) == [1, 2, 3]
+
+
+def test_journal_imports_legacy_files(tmp_path):
+    """Test that existing users.json/projects.json/tasks.json are migrated"""
+    with open(os.path.join(tmp_path, "users.json"), "w") as f:
+        json.dump({"a@example.com": {"id": 1, "email": "a@example.com"}}, f)
+    with open(os.path.join(tmp_path, "tasks.json"), "w") as f:
+        json.dump([{"id": 7, "title": "Legacy"}], f)
+
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert state["tasks"] == {7: {"id": 7, "title": "Legacy"}}
+    assert "a@example.com" in state["users"]
+    assert os.path.exists(os.path.join(tmp_path, JournalStorage.SNAPSHOT_FILE))
+
+
+def test_json_file_storage_rewrites_collection(tmp_path):
+    """Test the legacy whole-file engine keeps its on-disk format"""
+    live = {"users": {}, "projects": {1: {"id": 1}}, "tasks": {}}
+    engine = create_storage(str(tmp_path), engine="json")
+    assert isinstance(engine, JsonFileStorage)
+    engine.attach(lambda: live)
+    engine.put("projects", 1, live["projects"][1])
+
+    with open(os.path.join(tmp_path, "projects.json")) as f:
+        assert json.load(f) == [{"id": 1}]
+    assert engine.load()["projects"] == {1: {"id": 1}}
+
+
+class RecordingStorage(MemoryStorage):
+    """Engine that records writes and syncs, optionally blocking writes"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write(self, payload):
+        self.gate.wait()
+        self.calls.append(("write", payload))
+
+    def sync(self):
+        self.calls.append(("sync", None))
+
+
+def test_writer_group_commit_syncs_once_per_batch():
+    """Test that writes queued together share a single fsync"""
+    engine = RecordingStorage()
+    engine.gate.clear()
+    writer = StorageWriter(engine, durability="group")
+    futures = [writer.submit([("put", "tasks", i, {"id": i})]) for i in range(3)]
+    engine.gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    writer.close()
+
+    writes = [payload for call, payload in engine.calls if call == "write"]
+    assert [ops[0][2] for ops in writes if ops] == [0, 1, 2]
+    # The first write may be taken alone; the other two share one sync
+    syncs_before_close = engine.calls[: engine.calls.index(("write", []))]
+    assert syncs_before_close.count(("sync", None)) <= 2
+    assert syncs_before_close[-1] == ("sync", None)
+
+
+def test_writer_fsync_mode_syncs_every_write():
+    """Test that fsync durability syncs after each write"""
+    engine = RecordingStorage()
+    writer = StorageWriter(engine, durability="fsync")
+    for i in range(3):
+        writer.submit([("put", "tasks", i, {"id": i})]).result(timeout=5)
+    writer.close()
+
+    assert [call for call, _ in engine.calls[:6]] == ["write", "sync"] * 3
+
+
+def test_writer_async_mode_does_not_wait():
+    """Test that fire-and-forget writes return before the write happens"""
+    engine = RecordingStorage()
+    engine.gate.clear()
+    writer = StorageWriter(engine, durability="group")
+
+    async def persist():
+        await writer.put("tasks", 1, {"id": 1}, durability="async")
+
+    asyncio.run(persist())
+    assert engine.calls == []
+    engine.gate.set()
+    writer.close()
+    assert ("write", [("put", "tasks", 1, {"id": 1})]) in engine.calls
+
+
+def test_writer_persists_journal_in_background(tmp_path):
+    """Test the writer thread against the real journal engine"""
+    engine, _ = _reopen(str(tmp_path))
+    writer = StorageWriter(engine, durability="group")
+
+    async def persist():
+        await writer.put("tasks", 1, {"id": 1})
+        await writer.persist(
+            [("put", "tasks", 2, {"id": 2}), ("del", "tasks", 1, None)]
+        )
+
+    asyncio.run(persist())
+    writer.close()
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert state["tasks"] == {2: {"id": 2}}
+
+
+def test_writer_coalesces_a_burst_into_one_commit():
+    """Test that writes arriving within the window become one write and sync"""
+    engine = RecordingStorage()
+    writer = StorageWriter(engine, durability="group", window=0.5, max_ops=5)
+    futures = [writer.submit([("put", "tasks", i, {"id": i})]) for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert writer.batches == 1
+    assert engine.calls.count(("sync", None)) == 1
+    writer.close()
+
+
+def test_json_storage_coalesces_to_one_atomic_write(tmp_path):
+    """Test that a burst rewrites each collection file once via rename"""
+    live = {"users": {}, "projects": {}, "tasks": {}}
+    engine = JsonFileStorage(str(tmp_path))
+    engine.attach(lambda: live)
+    payloads = []
+    for task_id in range(1, 4):
+        live["tasks"][task_id] = {"id": task_id}
+        payloads.append(engine.encode([("put", "tasks", task_id, None)]))
+    engine.write_many(payloads)
+
+    assert sorted(os.listdir(tmp_path)) == ["tasks.json"]
+    with open(os.path.join(tmp_path, "tasks.json")) as f:
+        assert [t["id"] for t in json.load(f)] == [1, 2, 3]
+
+
+def _shared_pair(data_dir, compact_every=1000):
+    workers = []
+    for _ in range(2):
+        engine = JournalStorage(data_dir, compact_every=compact_every, shared=True)
+        live = engine.load()
+        engine.attach(lambda live=live: live)
+        workers.append((engine, live))
+    return workers
+
+
+def test_shared_journal_reads_other_workers_entries(tmp_path):
+    """Test that a worker sees entries appended by another worker"""
+    (a, _), (b, _) = _shared_pair(str(tmp_path))
+    a.put("tasks", 1, {"id": 1})
+    a.delete("tasks", 1)
+    a.put("tasks", 2, {"id": 2})
+
+    assert b.read_changes() == [
+        ("put", "tasks", 1, {"id": 1}),
+        ("del", "tasks", 1, None),
+        ("put", "tasks", 2, {"id": 2}),
+    ]
+    assert b.read_changes() == []
+    # A worker never reads back its own entries
+    assert a.read_changes() == []
+    a.close()
+    b.close()
+
+
+def test_shared_journal_ignores_incomplete_lines(tmp_path):
+    """Test that a line still being written is picked up once complete"""
+    (a, _), (b, _) = _shared_pair(str(tmp_path))
+    with open(a.journal_path, "ab") as f:
+        f.write(b'{"op":"put","c":"tasks","k":1,')
+        f.flush()
+        assert b.read_changes() == []
+        f.write(b'"v":{"id":1}}\n')
+    assert b.read_changes() == [("put", "tasks", 1, {"id": 1})]
+    a.close()
+    b.close()
+
+
+def test_shared_journal_follows_compaction(tmp_path):
+    """Test that readers finish the old journal and switch to the new one"""
+    (a, live_a), (b, _) = _shared_pair(str(tmp_path), compact_every=2)
+    with a.worker_lock:
+        for task_id in (1, 2, 3):
+            live_a["tasks"][task_id] = {"id": task_id}
+            a.put("tasks", task_id, live_a["tasks"][task_id])
+    assert a.generation == 1
+
+    assert [op[2] for op in b.read_changes()] == [1, 2, 3]
+    assert (b.generation, b.pending) == (1, 1)
+    a.put("tasks", 4, {"id": 4})
+    assert [op[2] for op in b.read_changes()] == [4]
+    a.close()
+    b.close()
+
+
+def _apply(live, ops):
+    for op, name, key, record in ops:
+        if op == "put":
+            live[name][key] = record
+        else:
+            live[name].pop(key, None)
+
+
+def test_shared_journal_reader_survives_two_compactions(tmp_path):
+    """Test that a reader that missed a whole journal rebuilds from the snapshot"""
+    (a, live_a), (b, live_b) = _shared_pair(str(tmp_path), compact_every=3)
+    with a.worker_lock:
+        live_a["tasks"][1] = {"id": 1, "title": "old"}
+        a.put("tasks", 1, live_a["tasks"][1])
+    _apply(live_b, b.read_changes())
+
+    # Compacts after the 3rd, 6th and 9th op: b never sees journals 1 and 2
+    with a.worker_lock:
+        live_a["tasks"][1] = {"id": 1, "title": "new"}
+        a.put("tasks", 1, live_a["tasks"][1])
+        for task_id in range(2, 8):
+            live_a["tasks"][task_id] = {"id": task_id}
+            a.put("tasks", task_id, live_a["tasks"][task_id])
+        del live_a["tasks"][2]
+        a.delete("tasks", 2)
+    assert a.generation == 3
+
+    ops = b.read_changes()
+    assert ("del", "tasks", 2, None) not in ops  # b never had it
+    _apply(live_b, ops)
+    assert live_b["tasks"] == live_a["tasks"]
+    assert (b.generation, b.max_ids["tasks"]) == (3, 7)
+    assert b.read_changes() == []
+    a.put("tasks", 8, {"id": 8})
+    assert b.read_changes() == [("put", "tasks", 8, {"id": 8})]
+    a.close()
+    b.close()
+
+
+def test_shared_journal_workers_agree_on_sequence(tmp_path):
+    """Test that every worker counts the same ops in the same epoch"""
+    (a, live_a), (b, live_b) = _shared_pair(str(tmp_path), compact_every=3)
+    assert a.epoch == b.epoch
+    _apply(live_b, b.read_changes())
+    with a.worker_lock:
+        for task_id in range(1, 5):
+            live_a["tasks"][task_id] = {"id": task_id}
+            a.put("tasks", task_id, live_a["tasks"][task_id])
+    _apply(live_b, b.read_changes())
+    assert a.sequence == b.sequence == 4
+
+    # b rebuilds from the snapshot after missing a whole journal
+    with a.worker_lock:
+        for task_id in range(1, 5):
+            del live_a["tasks"][task_id]
+            a.delete("tasks", task_id)
+        for task_id in range(5, 12):
+            live_a["tasks"][task_id] = {"id": task_id}
+            a.put("tasks", task_id, live_a["tasks"][task_id])
+    assert a.generation == 5
+    _apply(live_b, b.read_changes())
+    assert live_b["tasks"] == live_a["tasks"]
+    assert a.sequence == b.sequence == 15
+
+    c, _ = _reopen(str(tmp_path), shared=True)
+    assert (c.epoch, c.sequence) == (a.epoch, 15)
+    for engine in (a, b, c):
+        engine.close()
+
+
+def test_shared_journal_compacts_only_under_the_lock(tmp_path):
+    """Test that a worker not holding the lock leaves compaction to others"""
+    (a, live_a), (b, _) = _shared_pair(str(tmp_path), compact_every=2)
+    for task_id in (1, 2, 3):
+        live_a["tasks"][task_id] = {"id": task_id}
+        a.put("tasks", task_id, live_a["tasks"][task_id])
+    assert (a.generation, a.pending) == (0, 3)
+
+    # b has read the whole journal, so it sees the same count
+    assert len(b.read_changes()) == 3 and b.pending == 3
+    with a.worker_lock:
+        a.put("tasks", 4, {"id": 4})
+    assert (a.generation, a.pending) == (1, 0)
+    # The entry that triggered it is at the end of the old journal
+    assert [op[2] for op in b.read_changes()] == [4]
+    assert (b.generation, b.pending) == (1, 0)
+    a.close()
+    b.close()
+
+
+def test_journal_survives_interrupted_compaction(tmp_path):
+    """Test that entries appended after a snapshot whose journal swap never
+    happened are still replayed"""
+    live = {"users": {}, "projects": {}, "tasks": {}}
+    engine, _ = _reopen(str(tmp_path), compact_every=3)
+    engine.attach(lambda: live)
+    engine._rotate = lambda: None  # crash between snapshot and journal swap
+    for task_id in (1, 2, 3):
+        live["tasks"][task_id] = {"id": task_id}
+        engine.put("tasks", task_id, live["tasks"][task_id])
+    del live["tasks"][1]
+    engine.delete("tasks", 1)
+    engine.close()
+
+    engine, state = _reopen(str(tmp_path))
+    engine.close()
+    assert sorted(state["tasks"]) == [2, 3]
+    assert engine.generation == 0
+
+
+def test_worker_lock_is_exclusive(tmp_path):
+    """Test that a second lock holder waits for the first to release"""
+    path = str(tmp_path / "journal.lock")
+    first, second = WorkerLock(path), WorkerLock(path)
+    acquired = threading.Event()
+
+    def contend():
+        with second:
+            acquired.set()
+
+    with first:
+        thread = threading.Thread(target=contend)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join()
@@ -0,0 +1,401 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+
+test_data_dir = tempfile.mkdtemp()
+os.environ["TEST_DATA_DIR"] = test_data_dir
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+client = TestClient(app)
+
+
+def _new_user():
+    """Register a fresh user and return auth headers for them"""
+    email = f"{uuid.uuid4().hex[:8]}@example.com"
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": email,
+            "password": "secret",
+            "username": email,
+            "full_name": "Test User",
+        },
+    )
+    login = client.post("/api/auth/login", json={"email": email, "password": "secret"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def _create_task(headers, **fields):
+    body = {"title": "Task", **fields}
+    return client.post("/api/tasks", json=body, headers=headers).json()
+
+
+def test_task_filters():
+    """Test status, priority, project and due date filters"""
+    headers = _new_user()
+    a = _create_task(headers, status="todo", priority="high", due_date="2026-01-05")
+    b = _create_task(headers, status="done", priority="high", project_id=7)
+    c = _create_task(headers, status="todo", priority="low", due_date="2026-02-01")
+
+    def ids(**params):
+        response = client.get("/api/tasks", params=params, headers=headers)
+        assert response.status_code == 200
+        return [t["id"] for t in response.json()["tasks"]]
+
+    assert ids() == [a["id"], b["id"], c["id"]]
+    assert ids(status="todo") == [a["id"], c["id"]]
+    assert ids(status="todo", priority="high") == [a["id"]]
+    assert ids(project_id=7) == [b["id"]]
+    assert ids(due_before="2026-01-31") == [a["id"]]
+    assert ids(due_after="2026-01-05", due_before="2026-02-01") == [a["id"], c["id"]]
+
+
+def test_due_filters_include_done_and_follow_updates():
+    """Test that due date filters see done tasks and edited due dates"""
+    headers = _new_user()
+    a = _create_task(headers, status="done", due_date="2026-03-02")
+    b = _create_task(headers, status="todo", due_date="2026-03-09T10:00:00")
+
+    def ids(**params):
+        response = client.get("/api/tasks", params=params, headers=headers)
+        return [t["id"] for t in response.json()["tasks"]]
+
+    assert ids(due_after="2026-03-01") == [a["id"], b["id"]]
+    assert ids(due_before="2026-03-09", status="todo") == [b["id"]]
+    assert ids(due_after="2026-03-03", status="done") == []
+
+    client.put(
+        f"/api/tasks/{a['id']}", json={"due_date": "2026-04-01"}, headers=headers
+    )
+    assert ids(due_before="2026-03-31") == [b["id"]]
+    assert ids(due_after="2026-04-01", due_before="2026-04-01") == [a["id"]]
+
+
+def test_task_pagination():
+    """Test that limit and cursor page through tasks"""
+    headers = _new_user()
+    created = [_create_task(headers)["id"] for _ in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/tasks", params=params, headers=headers).json()
+        seen += [t["id"] for t in body["tasks"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == created
+
+    response = client.get("/api/tasks", params={"limit": 0}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_project_status_filter():
+    """Test that projects can be filtered by status"""
+    headers = _new_user()
+    for status in ("active", "archived", "active"):
+        client.post(
+            "/api/projects", json={"title": "P", "status": status}, headers=headers
+        )
+    body = client.get(
+        "/api/projects", params={"status": "active", "limit": 1}, headers=headers
+    ).json()
+    assert len(body["projects"]) == 1 and body["next_cursor"] is not None
+
+
+def test_due_tasks():
+    """Test overdue and upcoming views of open tasks"""
+    headers = _new_user()
+    today = datetime.now(timezone.utc).date()
+
+    def due(days):
+        return (today + timedelta(days=days)).isoformat()
+
+    late = _create_task(headers, due_date=due(-3))
+    _create_task(headers, due_date=due(-1), status="done")
+    soon = _create_task(headers, due_date=due(0))
+    later = _create_task(headers, due_date=due(5))
+    _create_task(headers, due_date=due(30))
+    _create_task(headers)
+
+    body = client.get("/api/tasks/due", headers=headers).json()
+    assert [t["id"] for t in body["overdue"]] == [late["id"]]
+    assert [t["id"] for t in body["upcoming"]] == [soon["id"], later["id"]]
+
+    client.put(f"/api/tasks/{late['id']}", json={"status": "done"}, headers=headers)
+    client.delete(f"/api/tasks/{soon['id']}", headers=headers)
+    body = client.get("/api/tasks/due", params={"days": 1}, headers=headers).json()
+    assert body["overdue"] == [] and body["upcoming"] == []
+
+
+def test_project_tasks():
+    """Test listing a project's tasks with an ownership check"""
+    headers = _new_user()
+    project = client.post("/api/projects", json={"title": "P"}, headers=headers)
+    project_id = project.json()["id"]
+    ids = [_create_task(headers, project_id=project_id)["id"] for _ in range(3)]
+    _create_task(headers)
+
+    response = client.get(f"/api/tasks/project/{project_id}", headers=headers)
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()["tasks"]] == ids
+
+    body = client.get(
+        f"/api/tasks/project/{project_id}", params={"limit": 2}, headers=headers
+    ).json()
+    assert [t["id"] for t in body["tasks"]] == ids[:2]
+    assert body["next_cursor"] == ids[1]
+
+    other = _new_user()
+    response = client.get(f"/api/tasks/project/{project_id}", headers=other)
+    assert response.status_code == 403
+    # Tasks another user files under the project stay private to them
+    _create_task(other, project_id=project_id)
+    response = client.get(f"/api/tasks/project/{project_id}", headers=headers)
+    assert [t["id"] for t in response.json()["tasks"]] == ids
+    response = client.get("/api/tasks/project/999999", headers=headers)
+    assert response.status_code == 404
+
+
+def test_batch_applies_operations_in_order():
+    """Test creating, updating and deleting in one batch request"""
+    headers = _new_user()
+    first = _create_task(headers)
+    second = _create_task(headers)
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [
+                {
+                    "op": "update",
+                    "type": "task",
+                    "id": first["id"],
+                    "data": {"status": "done"},
+                },
+                {"op": "delete", "type": "task", "id": second["id"]},
+                {"op": "create", "type": "project", "data": {"title": "Sprint"}},
+            ]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["op"] for r in results] == ["update", "delete", "create"]
+    assert results[0]["record"]["status"] == "done"
+
+    tasks = client.get("/api/tasks", headers=headers).json()["tasks"]
+    assert [(t["id"], t["status"]) for t in tasks] == [(first["id"], "done")]
+    projects = client.get("/api/projects", headers=headers).json()["projects"]
+    assert [p["title"] for p in projects] == ["Sprint"]
+
+
+def test_batch_is_all_or_nothing():
+    """Test that one failing operation rejects the whole batch"""
+    headers = _new_user()
+    task = _create_task(headers)
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [
+                {
+                    "op": "update",
+                    "type": "task",
+                    "id": task["id"],
+                    "data": {"status": "done"},
+                },
+                {"op": "delete", "type": "task", "id": task["id"]},
+                {"op": "delete", "type": "task", "id": task["id"]},
+                {"op": "update", "type": "project"},
+            ]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 400
+    errors = response.json()["detail"]["errors"]
+    assert [(e["index"], e["status_code"]) for e in errors] == [(2, 404), (3, 422)]
+    assert (
+        client.get(f"/api/tasks/{task['id']}", headers=headers).json()["status"]
+        == "todo"
+    )
+
+
+def test_list_etag_revalidation():
+    """Test that unchanged lists answer If-None-Match with 304"""
+    headers = _new_user()
+    _create_task(headers)
+    first = client.get("/api/tasks", headers=headers)
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/tasks", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    filtered = client.get(
+        "/api/tasks",
+        params={"status": "done"},
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert filtered.status_code == 200
+
+    _create_task(headers)
+    changed = client.get("/api/tasks", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["tasks"]) == 2
+
+
+def test_record_etag_revalidation():
+    """Test that a record's ETag changes only when the record does"""
+    headers = _new_user()
+    task = _create_task(headers)
+    other = _create_task(headers)
+    etag = client.get(f"/api/tasks/{task['id']}", headers=headers).headers["etag"]
+    conditional = {**headers, "If-None-Match": etag}
+
+    client.put(f"/api/tasks/{other['id']}", json={"status": "done"}, headers=headers)
+    response = client.get(f"/api/tasks/{task['id']}", headers=conditional)
+    assert response.status_code == 304
+
+    client.put(f"/api/tasks/{task['id']}", json={"status": "done"}, headers=headers)
+    response = client.get(f"/api/tasks/{task['id']}", headers=conditional)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+
+    # Access checks still run before the validator
+    response = client.get(
+        f"/api/tasks/{task['id']}", headers={**_new_user(), "If-None-Match": "*"}
+    )
+    assert response.status_code == 403
+
+
+def test_delta_sync():
+    """Test that sync returns only changes after the client's token"""
+    headers = _new_user()
+    kept = _create_task(headers)
+    gone = _create_task(headers)
+    first = client.get("/api/sync", headers=headers).json()
+    assert first["reset"] is True
+    assert [t["id"] for t in first["tasks"]] == [kept["id"], gone["id"]]
+
+    client.put(f"/api/tasks/{kept['id']}", json={"status": "done"}, headers=headers)
+    client.delete(f"/api/tasks/{gone['id']}", headers=headers)
+    project = client.post("/api/projects", json={"title": "P"}, headers=headers).json()
+    _create_task(_new_user())
+
+    delta = client.get(
+        "/api/sync", params={"since": first["version"]}, headers=headers
+    ).json()
+    assert delta["reset"] is False
+    assert [(t["id"], t["status"]) for t in delta["tasks"]] == [(kept["id"], "done")]
+    assert [p["id"] for p in delta["projects"]] == [project["id"]]
+    assert delta["deleted"] == {"projects": [], "tasks": [gone["id"]]}
+
+    empty = client.get(
+        "/api/sync", params={"since": delta["version"]}, headers=headers
+    ).json()
+    assert empty["tasks"] == [] and empty["version"] == delta["version"]
+
+
+def test_malformed_payloads_are_rejected():
+    """Test that request bodies are validated before anything is stored"""
+    headers = _new_user()
+    for body in (
+        {"title": "T", "status": "finished"},
+        {"title": "T", "priority": 5},
+        {"title": "T", "due_date": "next week"},
+        {"title": "T", "due_date": "2026-10-10 not a date at all"},
+        {"title": ""},
+    ):
+        response = client.post("/api/tasks", json=body, headers=headers)
+        assert response.status_code == 422, body
+    assert client.get("/api/tasks", headers=headers).json()["tasks"] == []
+
+    task = _create_task(headers, due_date="")
+    assert task["due_date"] is None
+    response = client.put(
+        f"/api/tasks/{task['id']}", json={"title": None}, headers=headers
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [{"op": "create", "type": "task", "data": {"status": "x"}}]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"]["errors"][0]["status_code"] == 422
+
+
+def test_export_ndjson_with_resume():
+    """Test streaming an export and resuming it from a cursor"""
+    headers = _new_user()
+    project = client.post("/api/projects", json={"title": "P"}, headers=headers).json()
+    tasks = [_create_task(headers, title=f"T{n}")["id"] for n in range(3)]
+
+    response = client.get("/api/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["type"], line["record"]["id"]) for line in lines] == [
+        ("project", project["id"])
+    ] + [("task", task_id) for task_id in tasks]
+
+    response = client.get(
+        "/api/export", params={"cursor": f"task:{tasks[0]}"}, headers=headers
+    )
+    assert [
+        json.loads(line)["record"]["id"] for line in response.text.splitlines()
+    ] == tasks[1:]
+
+    response = client.get("/api/export", params={"cursor": "nope"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_export_rejects_query_token():
+    """Test that the export only takes the token from the Authorization header"""
+    token = _new_user()["Authorization"].split()[1]
+    response = client.get("/api/export", params={"token": token})
+    assert response.status_code == 401
+
+
+def test_export_csv():
+    """Test the CSV export header and rows"""
+    headers = _new_user()
+    _create_task(headers, title="Comma, quoted")
+    response = client.get("/api/export", params={"format": "csv"}, headers=headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["type"], row["title"], row["status"]) for row in rows] == [
+        ("task", "Comma, quoted", "todo")
+    ]
+
+
+def test_dashboard_summary_tracks_changes():
+    headers = _new_user()
+    today = datetime.now(timezone.utc).date()
+    project = client.post("/api/projects", json={"title": "P"}, headers=headers).json()
+    late = _create_task(headers, due_date=(today - timedelta(days=2)).isoformat())
+    _create_task(headers, status="done", priority="high", project_id=project["id"])
+    _create_task(headers, due_date=today.isoformat())
+
+    summary = client.get("/api/dashboard/summary", headers=headers).json()
+    assert summary["projects"] == {"total": 1, "status": {"active": 1}}
+    tasks = summary["tasks"]
+    assert tasks["total"] == 3 and tasks["open"] == 2
+    assert tasks["status"] == {"todo": 2, "in_progress": 0, "review": 0, "done": 1}
+    assert tasks["priority"] == {"low": 0, "medium": 2, "high": 1}
+    assert tasks["overdue"] == 1 and tasks["due_today"] == 1
+
+    client.put(f"/api/tasks/{late['id']}", json={"status": "done"}, headers=headers)
+    client.delete(f"/api/projects/{project['id']}", headers=headers)
+    tasks = client.get("/api/dashboard/summary", headers=headers).json()["tasks"]
+    assert tasks["total"] == 2 and tasks["overdue"] == 0
+    assert tasks["status"]["done"] == 1
@@ -1,5 +1,5 @@
-import React, { createContext, useContext, useReducer, useEffect } from 'react';
-import { projectsAPI, tasksAPI } from '../services/api';
+import React, { createContext, useContext, useReducer, useEffect, useRef } from 'react';
+import { projectsAPI, tasksAPI, syncAPI, eventsAPI } from '../services/api';
 import { toast } from 'react-hot-toast';
 
 // Initial state
@@ -22,9 +22,18 @@ const ACTIONS = {
   ADD_TASK: 'ADD_TASK',
   UPDATE_TASK: 'UPDATE_TASK',
   DELETE_TASK: 'DELETE_TASK',
+  APPLY_SYNC: 'APPLY_SYNC',
   CLEAR_DATA: 'CLEAR_DATA'
 };
 
+// Apply changed and deleted records from /sync to a list, keeping id order
+const mergeChanges = (items, changed, deletedIds) => {
+  const byId = new Map(items.map(item => [item.id, item]));
+  deletedIds.forEach(id => byId.delete(id));
+  changed.forEach(item => byId.set(item.id, item));
+  return [...byId.values()].sort((a, b) => a.id - b.id);
+};
+
 // Reducer function
 const dataReducer = (state, action) => {
   switch (action.type) {
@@ -64,6 +73,18 @@ const dataReducer = (state, action) => {
         ...state,
         tasks: state.tasks.filter(task => task.id !== action.payload)
       };
+    case ACTIONS.APPLY_SYNC: {
+      const { reset, projects, tasks, deleted } = action.payload;
+      if (reset) {
+        return { ...state, projects, tasks, loading: false };
+      }
+      return {
+        ...state,
+        projects: mergeChanges(state.projects, projects, deleted.projects),
+        tasks: mergeChanges(state.tasks, tasks, deleted.tasks),
+        loading: false
+      };
+    }
     case ACTIONS.CLEAR_DATA:
       return initialState;
     default:
@@ -77,22 +98,18 @@ const DataContext = createContext();
 // Provider component
 export const DataProvider = ({ children }) => {
   const [state, dispatch] = useReducer(dataReducer, initialState);
+  // Sync token from the last /sync response; null forces a full load
+  const syncVersion = useRef(null);
 
-  // Load initial data
-  const loadData = async () => {
+  // Load data, fetching only what changed since the previous load
+  const loadData = async ({ silent = false } = {}) => {
     try {
-      dispatch({ type: ACTIONS.SET_LOADING, payload: true });
-      
-      const [projectsResponse, tasksResponse] = await Promise.all([
-        projectsAPI.getProjects(),
-        tasksAPI.getTasks()
-      ]);
-
-      const projects = projectsResponse.data.projects || projectsResponse.data || [];
-      const tasks = tasksResponse.data.tasks || tasksResponse.data || [];
-
-      dispatch({ type: ACTIONS.SET_PROJECTS, payload: projects });
-      dispatch({ type: ACTIONS.SET_TASKS, payload: tasks });
+      if (!silent) {
+        dispatch({ type: ACTIONS.SET_LOADING, payload: true });
+      }
+      const response = await syncAPI.getChanges(syncVersion.current);
+      syncVersion.current = response.data.version;
+      dispatch({ type: ACTIONS.APPLY_SYNC, payload: response.data });
     } catch (error) {
       console.error('Error loading data:', error);
       dispatch({ type: ACTIONS.SET_ERROR, payload: 'Failed to load data' });
@@ -202,6 +219,7 @@ export const DataProvider = ({ children }) => {
 
   // Clear data on logout
   const clearData = () => {
+    syncVersion.current = null;
     dispatch({ type: ACTIONS.CLEAR_DATA });
   };
 
@@ -213,6 +231,30 @@ export const DataProvider = ({ children }) => {
     }
   }, []);
 
+  // Follow live changes; bursts of events are folded into one delta sync
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    let pending = null;
+    const refresh = () => {
+      if (!pending) {
+        pending = setTimeout(() => {
+          pending = null;
+          loadData({ silent: true });
+        }, 100);
+      }
+    };
+    const source = new EventSource(eventsAPI.url(token));
+    source.addEventListener('change', refresh);
+    source.addEventListener('resync', refresh);
+    return () => {
+      clearTimeout(pending);
+      source.close();
+    };
+  }, []);
+
   const value = {
     ...state,
     loadData,
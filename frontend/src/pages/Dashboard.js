@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import { useData } from '../contexts/DataContext';
+import { dashboardAPI } from '../services/api';
 import { toast } from 'react-hot-toast';
 import { 
   Users, 
@@ -27,17 +28,18 @@ const Dashboard = () => {
     pendingTasks: 0
   });
 
-  // Calculate stats when projects or tasks change
+  // Refresh the server-side counts when projects or tasks change
   useEffect(() => {
-    const completedTasks = tasks.filter(task => task.status === 'done').length;
-    const pendingTasks = tasks.filter(task => task.status !== 'done').length;
-
-    setStats({
-      totalProjects: projects.length,
-      totalTasks: tasks.length,
-      completedTasks,
-      pendingTasks
-    });
+    dashboardAPI.getSummary()
+      .then(({ data }) => {
+        setStats({
+          totalProjects: data.projects.total,
+          totalTasks: data.tasks.total,
+          completedTasks: data.tasks.status.done,
+          pendingTasks: data.tasks.open
+        });
+      })
+      .catch((err) => console.error('Failed to load dashboard summary:', err));
   }, [projects, tasks]);
 
   // Get recent projects and tasks
@@ -29,10 +29,8 @@ const ProjectDetail = () => {
       const projectRes = await projectsAPI.getProject(id);
       setProject(projectRes.data);
       
-      // Get all tasks for the current user (we'll filter by project_id on frontend)
-      const tasksRes = await tasksAPI.getTasks();
-      const projectTasks = tasksRes.data.tasks.filter(task => task.project_id === parseInt(id));
-      setTasks(projectTasks);
+      const tasksRes = await tasksAPI.getTasksByProject(id);
+      setTasks(tasksRes.data.tasks);
       
     } catch (error) {
       console.error('Error fetching project data:', error);
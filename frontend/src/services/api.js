@@ -59,7 +59,7 @@ export const usersAPI = {
 
 // Projects API
 export const projectsAPI = {
-  getProjects: () => api.get('/projects'),
+  getProjects: (params) => api.get('/projects', { params }),
   getProject: (id) => api.get(`/projects/${id}`),
   createProject: (data) => api.post('/projects', data),
   updateProject: (id, data) => api.put(`/projects/${id}`, data),
@@ -68,14 +68,54 @@ export const projectsAPI = {
 
 // Tasks API
 export const tasksAPI = {
-  getTasks: () => api.get('/tasks'),
+  getTasks: (params) => api.get('/tasks', { params }),
   getTasksByProject: (projectId) => api.get(`/tasks/project/${projectId}`),
+  getDueTasks: (days) => api.get('/tasks/due', { params: { days } }),
   getTask: (id) => api.get(`/tasks/${id}`),
   createTask: (data) => api.post('/tasks', data),
   updateTask: (id, data) => api.put(`/tasks/${id}`, data),
   deleteTask: (id) => api.delete(`/tasks/${id}`),
 };
 
+// Sync API: changes since the token returned by the previous call
+export const syncAPI = {
+  getChanges: (since) => api.get('/sync', { params: since ? { since } : {} }),
+};
+
+// Events API: Server-Sent Events change feed (EventSource cannot send headers)
+export const eventsAPI = {
+  url: (token) => `${API_BASE_URL}/events?token=${encodeURIComponent(token)}`,
+};
+
+// Export API: download of the user's projects and tasks, fetched with the
+// Authorization header (a token in the URL ends up in history and logs)
+export const exportAPI = {
+  download: async (format = 'ndjson') => {
+    const response = await api.get('/export', {
+      params: { format },
+      responseType: 'blob',
+    });
+    const url = URL.createObjectURL(response.data);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = `campus-connect-export.${format}`;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    URL.revokeObjectURL(url);
+  },
+};
+
+// Batch API: ordered create/update/delete operations applied all-or-nothing
+export const batchAPI = {
+  apply: (operations) => api.post('/batch', { operations }),
+};
+
+// Dashboard API: per-user counts maintained by the server
+export const dashboardAPI = {
+  getSummary: () => api.get('/dashboard/summary'),
+};
+
 // Project Members API
 export const projectMembersAPI = {
   getProjectMembers: (projectId) => api.get(`/project-members/project/${projectId}`),